@@ -189,13 +189,22 @@ android {
     }
 }
 
+// The app's Python version, which the template databases are also created with.
+val pythonVersion = "3.9"
+
+// Python source directory per variant for the generated template databases package. It's kept
+// out of the extracted pip packages since those are an input of the version task, which the
+// template task depends on.
+fun templateDatabaseDir(variantName: String): Provider<Directory> =
+    layout.buildDirectory.dir("generated/python/template/$variantName")
+
 // Chaquopy configuration
 // https://chaquo.com/chaquopy/doc/15.0/android.html
 chaquopy {
     defaultConfig {
         // Python version. Keep this in sync with the pruned Kolibri C extension versions in
         // prunepackages.py.
-        version = "3.9"
+        version = pythonVersion
 
         // Packages to install with pip.
         pip {
@@ -232,6 +241,17 @@ chaquopy {
         extractPackages("kolibri.dist.rest_framework.authtoken.migrations")
         extractPackages("kolibri_explore_plugin.migrations")
         extractPackages("kolibri_android.plugin.migrations")
+
+        // The template databases are copied from the filesystem on the first launch.
+        extractPackages("kolibri_android_template")
+    }
+
+    // Add the generated template databases package to each variant's Python sources. There are
+    // no product flavors, so the variants are named after the build types.
+    sourceSets {
+        android.buildTypes.forEach { buildType ->
+            maybeCreate(buildType.name).srcDir(templateDatabaseDir(buildType.name))
+        }
     }
 }
 
@@ -293,13 +313,66 @@ fun createPruneTask(variant: Variant): TaskProvider<Exec> {
     return tasks.register<Exec>("prune${taskVariant}PythonPackages") {
         val pkgroot = layout.buildDirectory.dir("python/pip/${variant.name}")
         val report = layout.buildDirectory.file("outputs/logs/prune-${variant.name}-report.txt")
+        val jsonReport = layout.buildDirectory.file(
+            "outputs/logs/prune-${variant.name}-report.json",
+        )
         commandLine(
             "./scripts/prunepackages.py",
             "--pkgroot",
             pkgroot.get().asFile.path,
             "--report",
             report.get().asFile.path,
+            "--json-report",
+            jsonReport.get().asFile.path,
+        )
+    }
+}
+
+// Create a task per variant that adds precompressed siblings of the static
+// assets in the extracted python packages.
+fun createCompressStaticTask(variant: Variant): TaskProvider<Exec> {
+    val taskVariant = variant.name.replaceFirstChar { it.uppercase() }
+    return tasks.register<Exec>("compress${taskVariant}StaticAssets") {
+        val pkgroot = layout.buildDirectory.dir("python/pip/${variant.name}")
+        val report = layout.buildDirectory.file(
+            "outputs/logs/compress-static-${variant.name}-report.txt",
+        )
+        commandLine(
+            "./scripts/compressstatic.py",
+            "--pkgroot",
+            pkgroot.get().asFile.path,
+            "--report",
+            report.get().asFile.path,
+        )
+    }
+}
+
+// Create a task per variant that creates the pre-migrated template databases package in the
+// variant's generated python source directory.
+// The template databases are migrated by running the extracted Android packages with the build
+// host's python3, which must be the same version as the app's Python and able to import Kolibri
+// from them. If it can't, templatedb.py logs a warning and creates no template, in which case
+// the app migrates the databases from scratch on the first launch.
+fun createTemplateDatabaseTask(variant: Variant): TaskProvider<Exec> {
+    val taskVariant = variant.name.replaceFirstChar { it.uppercase() }
+    return tasks.register<Exec>("create${taskVariant}TemplateDatabase") {
+        val pkgroot = layout.buildDirectory.dir("python/pip/${variant.name}")
+        val versionFile = layout.buildDirectory.file("outputs/version-${variant.name}.json")
+        val output = templateDatabaseDir(variant.name)
+        commandLine(
+            "./scripts/templatedb.py",
+            "--pkgroot",
+            pkgroot.get().asFile.path,
+            "--version-file",
+            versionFile.get().asFile.path,
+            "--python-version",
+            pythonVersion,
+            "--output",
+            output.get().asFile.path,
         )
+        inputs.file("scripts/templatedb.py")
+        inputs.file("src/main/python/kolibri_android/template_db.py")
+        outputs.dir(output)
     }
 }
 
@@ -357,8 +430,28 @@ val extractCollectionsTask = tasks.register<Sync>("extractCollections") {
     into(collectionsDirectory)
 }
 
+// Compile the collection manifests into an index next to the collections
+// directory so they don't have to be parsed from JSON at runtime.
+val collectionsIndexFile: RegularFile = layout.projectDirectory.file(
+    "src/main/python/kolibri_android/collections.index",
+)
+
+val indexCollectionsTask = tasks.register<Exec>("indexCollections") {
+    inputs.files(extractCollectionsTask)
+    inputs.file("scripts/indexcollections.py")
+    inputs.file("src/main/python/kolibri_android/collections_index.py")
+    outputs.file(collectionsIndexFile)
+    commandLine(
+        "./scripts/indexcollections.py",
+        "--output",
+        collectionsIndexFile.asFile.path,
+        collectionsDirectory.asFile.path,
+    )
+}
+
 val cleanCollectionsTask = tasks.register<Delete>("cleanCollections") {
     delete(collectionsDirectory)
+    delete(collectionsIndexFile)
 }
 
 // Task class for collecting build assets. This needs to be a class that accepts a DirectoryProperty
@@ -452,11 +545,12 @@ androidComponents {
 // https://docs.gradle.org/current/kotlin-dsl/gradle/org.gradle.api/-project/after-evaluate.html
 project.afterEvaluate {
     project.afterEvaluate {
-        // Add extracted apps-bundle and collections files as inputs to extracting the local python
-        // files.
+        // Add extracted apps-bundle and collections files and the collections index as inputs to
+        // extracting the local python files.
         tasks.named("extractPythonBuildPackages").configure {
             inputs.files(extractAppsBundleTask)
             inputs.files(extractCollectionsTask)
+            inputs.files(indexCollectionsTask)
         }
 
         // Python package assets are created per build variant, so any tasks that depend on those
@@ -480,14 +574,33 @@ project.afterEvaluate {
             pruneTask.configure {
                 inputs.files(requirementsTask)
             }
+            // Precompress the static assets that remain after pruning.
+            val compressStaticTask = createCompressStaticTask(variant)
+            compressStaticTask.configure {
+                dependsOn(pruneTask)
+            }
+            // Migrate the template databases with the pruned packages.
+            val templateDatabaseTask = createTemplateDatabaseTask(variant)
+            templateDatabaseTask.configure {
+                dependsOn(pruneTask)
+                inputs.files(versionTask)
+            }
+            // Merge the generated template package with the app's Python sources.
+            tasks.named("merge${taskVariant}PythonSources").configure {
+                inputs.files(templateDatabaseTask)
+            }
             requirementsTask.configure {
-                // Make the requirements task run again if the pruning script has changed.
+                // Make the requirements task run again if the pruning or
+                // compression scripts have changed.
                 inputs.file("scripts/prunepackages.py")
+                inputs.file("scripts/compressstatic.py")
             }
             requirementsAssetsTask.configure {
-                // dependsOn is used here instead of wiring the prune task
-                // outputs since there aren't any outputs.
+                // dependsOn is used here instead of wiring the prune and
+                // compress task outputs since they modify the extracted
+                // packages in place.
                 dependsOn(pruneTask)
+                dependsOn(compressStaticTask)
             }
         }
     }
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Count the queries of requests logged in by AlwaysAuthenticatedMiddleware
+
+Kolibri is initialized with a copy of the given KOLIBRI_HOME and the
+kolibri_android settings module. Unauthenticated requests are passed
+through the session and authentication middleware and then
+AlwaysAuthenticatedMiddleware, which logs them in as the device user.
+The queries run on every database while logging each request in are
+counted and timed, both for the middleware and for a variant that
+provisions the user on every request like it did before the user was
+cached. The script fails if the cached middleware doesn't run fewer
+queries. Kolibri must be installed in the host Python environment.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from shutil import copytree
+
+PYTHON_SRC_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../src/main/python"
+)
+
+
+def create_middlewares():
+    from kolibri_android.kolibri_extra.middleware import AlwaysAuthenticatedMiddleware
+
+    class ProvisioningMiddleware(AlwaysAuthenticatedMiddleware):
+        def _get_user(self):
+            return self._provision_user()
+
+    return {
+        "provision": ProvisioningMiddleware(),
+        "cached": AlwaysAuthenticatedMiddleware(),
+    }
+
+
+def log_in(middleware):
+    """Log in a new unauthenticated request
+
+    Returns the number of queries and the elapsed time.
+    """
+    from django.contrib.auth.middleware import AuthenticationMiddleware
+    from django.contrib.sessions.middleware import SessionMiddleware
+    from django.db import connections
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+
+    request = RequestFactory().get("/")
+    SessionMiddleware().process_request(request)
+    AuthenticationMiddleware().process_request(request)
+
+    with ExitStack() as stack:
+        contexts = [
+            stack.enter_context(CaptureQueriesContext(conn))
+            for conn in connections.all()
+        ]
+        start = time.perf_counter()
+        middleware.process_request(request)
+        elapsed = time.perf_counter() - start
+
+    if not request.user.is_authenticated:
+        raise RuntimeError("Request was not logged in")
+    return sum(len(context) for context in contexts), elapsed
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", help="KOLIBRI_HOME directory containing db.sqlite3")
+    ap.add_argument(
+        "-n",
+        "--requests",
+        type=int,
+        default=50,
+        help="number of requests per mode (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kolibri_home = os.path.join(tmpdir, "KOLIBRI_DATA")
+        copytree(args.home, kolibri_home)
+        os.environ["KOLIBRI_HOME"] = kolibri_home
+        os.environ["DJANGO_SETTINGS_MODULE"] = "kolibri_android.kolibri_extra.settings"
+        sys.path.insert(0, PYTHON_SRC_DIR)
+
+        from kolibri.utils.main import initialize
+
+        initialize(skip_update=True)
+
+        middlewares = create_middlewares()
+        # Provision the user before counting.
+        for middleware in middlewares.values():
+            log_in(middleware)
+
+        results = {mode: [] for mode in middlewares}
+        # Alternate the modes so they're equally affected by host load.
+        for _ in range(args.requests):
+            for mode, middleware in middlewares.items():
+                results[mode].append(log_in(middleware))
+
+    queries = {}
+    for mode, mode_results in results.items():
+        queries[mode] = statistics.median(count for count, _ in mode_results)
+        times = [elapsed * 1000 for _, elapsed in mode_results]
+        print(
+            f"{mode}: median {queries[mode]} queries, "
+            f"median {statistics.median(times):.2f}ms, "
+            f"max {max(times):.2f}ms"
+        )
+
+    if queries["cached"] >= queries["provision"]:
+        sys.exit("The cached user didn't save any queries")
+
+
+if __name__ == "__main__":
+    main()
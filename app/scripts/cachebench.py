@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Count the bytes served on a second launch with the WebView HTTP cache
+
+A page load recorded in a HAR file is replayed against a host Kolibri
+server using the kolibri_android settings module, once without and once
+with the bundled app cache headers enabled. Each mode replays two
+launches with a fresh server process. Responses from the first launch
+are stored in a simple HTTP cache modelled on the WebView's: fresh
+entries are reused without a request, and stale entries with an ETag
+are revalidated with If-None-Match. The requests sent and the bytes
+received on each launch are reported. Kolibri and the explore
+plugin must be installed in the host Python environment and enabled in
+the given KOLIBRI_HOME.
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+import urllib.request
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copytree
+from urllib.error import HTTPError
+
+from poolbench import BROWSER_CONNECTIONS
+from poolbench import load_har_paths
+from poolbench import run_server
+
+PYTHON_SRC_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../src/main/python"
+)
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class HTTPCache:
+    """Minimal private HTTP cache keyed by path
+
+    age is added to the time an entry was stored to simulate the time
+    between launches.
+    """
+
+    def __init__(self, age=0):
+        self.age = age
+        self._entries = {}
+
+    def store(self, path, headers, size):
+        cache_control = headers.get("Cache-Control", "")
+        if "no-store" in cache_control:
+            return
+        match = MAX_AGE_RE.search(cache_control)
+        max_age = (
+            int(match.group(1)) if match and "no-cache" not in cache_control else 0
+        )
+        etag = headers.get("ETag")
+        if max_age or etag:
+            self._entries[path] = (time.time() + max_age, etag, size)
+
+    def lookup(self, path):
+        """Returns whether the entry is fresh and its ETag"""
+        entry = self._entries.get(path)
+        if entry is None:
+            return False, None
+        expires, etag, _ = entry
+        return time.time() + self.age < expires, etag
+
+
+def fetch(opener, base_url, path, cache):
+    """Fetch a path through the cache
+
+    Returns a tuple of whether a request was sent and the bytes received.
+    """
+    fresh, etag = cache.lookup(path)
+    if fresh:
+        return False, 0
+
+    request = urllib.request.Request(base_url + path)
+    if etag:
+        request.add_header("If-None-Match", etag)
+    try:
+        with opener.open(request) as response:
+            size = len(response.read())
+            cache.store(path, response.headers, size)
+    except HTTPError as err:
+        size = len(err.read())
+    return True, size
+
+
+def launch(kolibri_home, env, paths, cache):
+    with run_server(kolibri_home, env) as (opener, base_url):
+        with ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS) as executor:
+            return list(
+                executor.map(lambda path: fetch(opener, base_url, path, cache), paths)
+            )
+
+
+def benchmark_mode(kolibri_home, env, paths, age):
+    cache = HTTPCache(age)
+    first = launch(kolibri_home, env, paths, cache)
+    second = launch(kolibri_home, env, paths, cache)
+    return first, second
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", help="KOLIBRI_HOME directory to serve")
+    ap.add_argument("har", help="HAR file of a recorded page load")
+    ap.add_argument(
+        "--apps-bundle",
+        help="directory of bundled apps to serve as KOLIBRI_APPS_BUNDLE_PATH",
+    )
+    ap.add_argument(
+        "--age",
+        type=int,
+        default=7 * 24 * 60 * 60,
+        help="seconds between the launches (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    paths = load_har_paths(args.har)
+    print(f"Replaying {len(paths)} requests", file=sys.stderr)
+
+    base_env = {
+        "DJANGO_SETTINGS_MODULE": "kolibri_android.kolibri_extra.settings",
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [PYTHON_SRC_DIR, os.environ.get("PYTHONPATH")])
+        ),
+    }
+    if args.apps_bundle:
+        base_env["KOLIBRI_APPS_BUNDLE_PATH"] = os.path.abspath(args.apps_bundle)
+    modes = (
+        ("default", {"KOLIBRI_ANDROID_BUNDLE_VERSION": ""}),
+        ("bundle_cache", {"KOLIBRI_ANDROID_BUNDLE_VERSION": "cachebench+1"}),
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"{'launch':<20} {'requests':>9} {'bytes':>10}")
+        for name, env in modes:
+            kolibri_home = os.path.join(tmpdir, name)
+            copytree(args.home, kolibri_home)
+
+            first, second = benchmark_mode(
+                kolibri_home, dict(base_env, **env), paths, args.age
+            )
+            for launch_name, results in (("first", first), ("second", second)):
+                requests = sum(sent for sent, _ in results)
+                size = sum(size for _, size in results)
+                print(f"{name + ' ' + launch_name:<20} {requests:>9} {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Benchmark reading collection manifests from JSON files and the index
+
+A large synthetic collection set is generated, or an existing
+collections directory is used, and every manifest is read the way the
+explore plugin does, first by parsing each JSON file and then from the
+compiled collections index. The time to read a single manifest, as for
+the first collection lookup, and all manifests is reported for each.
+Kolibri isn't needed.
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src/main/python")
+)
+from kolibri_android.collections_index import CollectionsIndex  # noqa: E402
+from kolibri_android.collections_index import write_collections_index  # noqa: E402
+
+
+def create_collections(collections_dir, count, channels, nodes):
+    """Create manifests shaped like the endless-key-collections packs"""
+    rng = random.Random(0)
+
+    def node_id():
+        return uuid.UUID(int=rng.getrandbits(128)).hex
+
+    for i in range(count):
+        manifest = {
+            "channels": [
+                {
+                    "id": node_id(),
+                    "version": rng.randint(1, 20),
+                    "include_node_ids": [node_id() for _ in range(nodes)],
+                }
+                for _ in range(channels)
+            ],
+            "metadata": {
+                "title": f"Collection {i}",
+                "subtitle": "0001",
+                "description": "Synthetic collection",
+                "required_gigabytes": rng.randint(1, 30),
+                "tagged_node_ids": [
+                    {"node_id": node_id(), "tags": ["highlight"]} for _ in range(nodes)
+                ],
+            },
+            "channel_list_hash": "",
+        }
+        with open(collections_dir / f"collection{i}-0001.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+def read_json(collections_dir, names):
+    for name in names:
+        with open(collections_dir / f"{name}.json", "r") as f:
+            json.load(f)
+
+
+def read_index(index_path, names):
+    index = CollectionsIndex(index_path)
+    for name in names:
+        index.get(name)
+    index.close()
+
+
+def measure(func, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("collections", nargs="?", type=Path, help="collections directory")
+    ap.add_argument(
+        "--count",
+        type=int,
+        default=50,
+        help="generated manifests (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--channels",
+        type=int,
+        default=20,
+        help="channels per generated manifest (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--nodes",
+        type=int,
+        default=2000,
+        help="node IDs per generated channel (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of runs (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        collections_dir = args.collections
+        if collections_dir is None:
+            collections_dir = Path(tmpdir) / "collections"
+            collections_dir.mkdir()
+            print("Generating collections", file=sys.stderr)
+            create_collections(collections_dir, args.count, args.channels, args.nodes)
+
+        names = sorted(path.stem for path in collections_dir.glob("*.json"))
+        manifests = {}
+        json_size = 0
+        for name in names:
+            path = collections_dir / f"{name}.json"
+            json_size += path.stat().st_size
+            with path.open("r") as f:
+                manifests[name] = json.load(f)
+
+        index_path = os.path.join(tmpdir, "collections.index")
+        start = time.perf_counter()
+        write_collections_index(index_path, manifests)
+        build_time = time.perf_counter() - start
+        del manifests
+
+        print(
+            f"{len(names)} manifests, {json_size} bytes of JSON, "
+            f"{os.path.getsize(index_path)} byte index built in {build_time:.2f}s"
+        )
+        print(f"{'':<8} {'first':>10} {'all':>10}")
+        for label, func, source in (
+            ("json", read_json, collections_dir),
+            ("index", read_index, index_path),
+        ):
+            first = measure(lambda: func(source, names[:1]), args.runs)
+            full = measure(lambda: func(source, names), args.runs)
+            print(f"{label:<8} {first * 1000:>8.1f}ms {full * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Precompress static assets in the extracted python packages
+
+Kolibri serves static files with whitenoise, which sends a .gz or .br
+sibling of a file instead of the file itself when the client accepts
+that encoding. Kolibri ships .gz siblings for its own assets, but other
+plugins such as the explore plugin don't. This adds the missing siblings
+so the large webpacked JS and CSS bundles aren't sent uncompressed to
+the web view.
+"""
+import gzip
+import logging
+import os
+from argparse import ArgumentParser
+from glob import iglob
+from pathlib import Path
+
+logger = logging.getLogger("compress")
+
+STATIC_GLOBS = [
+    "common/*/static/**/*",
+    "common/*/*/static/**/*",
+    "common/*/*/*/static/**/*",
+]
+
+# Django admin and rest framework static files aren't used by the app.
+EXCLUDE_PREFIXES = [
+    "common/kolibri/dist/",
+]
+
+COMPRESS_EXTENSIONS = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".svg",
+    ".ttf",
+    ".txt",
+    ".xml",
+}
+
+# Small files aren't worth an extra file in the APK.
+MIN_SIZE = 1024
+
+# Compressed files are only kept if they're smaller than this fraction of
+# the original, like whitenoise's compressor.
+MAX_RATIO = 0.95
+
+
+def gzip_compress(data):
+    # Use a fixed mtime so the output is reproducible.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def get_compressors(use_brotli):
+    compressors = {".gz": gzip_compress}
+    if use_brotli:
+        import brotli
+
+        compressors[".br"] = lambda data: brotli.compress(
+            data, mode=brotli.MODE_TEXT, quality=11
+        )
+    return compressors
+
+
+def find_static_files(pkgroot):
+    seen = set()
+    for pattern in STATIC_GLOBS:
+        for match in iglob(f"{pkgroot}/{pattern}", recursive=True):
+            path = Path(match)
+            relpath = path.relative_to(pkgroot).as_posix()
+            if path in seen or not path.is_file():
+                continue
+            if any(relpath.startswith(prefix) for prefix in EXCLUDE_PREFIXES):
+                continue
+            seen.add(path)
+            yield path
+
+
+def compress_file(path, compressors, dry_run=False):
+    """Write the missing compressed siblings of a file
+
+    Returns the number of bytes added.
+    """
+    data = None
+    added = 0
+    for suffix, compress in compressors.items():
+        compressed_path = path.with_name(path.name + suffix)
+        if compressed_path.exists():
+            continue
+        if data is None:
+            data = path.read_bytes()
+        compressed = compress(data)
+        if len(compressed) > len(data) * MAX_RATIO:
+            logger.info(f"Skipping '{compressed_path}', not enough compression")
+            continue
+        logger.info(
+            f"Writing '{compressed_path}' ({len(data)} -> {len(compressed)} bytes)"
+        )
+        if not dry_run:
+            compressed_path.write_bytes(compressed)
+        added += len(compressed)
+    return added
+
+
+def compress_static(pkgroot, use_brotli=False, dry_run=False):
+    compressors = get_compressors(use_brotli)
+    files = 0
+    added = 0
+    for path in find_static_files(pkgroot):
+        if path.suffix not in COMPRESS_EXTENSIONS:
+            continue
+        if path.stat().st_size < MIN_SIZE:
+            continue
+        size = compress_file(path, compressors, dry_run)
+        if size:
+            files += 1
+            added += size
+    logger.info(f"Compressed {files} files adding {added} bytes")
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-p",
+        "--pkgroot",
+        default=Path("."),
+        type=Path,
+        help="package root directory",
+    )
+    parser.add_argument(
+        "-r",
+        "--report",
+        type=Path,
+        help="report file path",
+    )
+    parser.add_argument(
+        "--brotli",
+        action="store_true",
+        help="also write .br files, which requires the brotli module",
+    )
+    parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="only show what would be written",
+    )
+    args = parser.parse_args()
+
+    logging_config = {"level": logging.INFO}
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        logging_config.update(
+            {
+                "filename": os.fspath(args.report),
+                "filemode": "w",
+            }
+        )
+    logging.basicConfig(**logging_config)
+
+    compress_static(args.pkgroot.resolve(), args.brotli, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Benchmark first launch initialization with and without template databases
+
+Each run initializes Kolibri in a fresh Python process and an empty
+KOLIBRI_HOME with the kolibri_android settings module, plugins and
+automatic provisioning, the way the app's first launch does. The
+template databases created by templatedb.py are either ignored, so
+every migration is applied, or copied into KOLIBRI_HOME first. Kolibri
+must be installed in the host Python environment.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+
+PYTHON_SRC_DIR = Path(__file__).absolute().parent.parent / "src/main/python"
+PROVISION_FILE = PYTHON_SRC_DIR / "kolibri_android/automatic_provision.json"
+
+sys.path.insert(0, os.fspath(PYTHON_SRC_DIR))
+from kolibri_android.template_db import read_template_stamp  # noqa: E402
+
+CHILD_CODE = """
+import json
+import time
+
+start = time.perf_counter()
+template_dir = {template_dir!r}
+if template_dir:
+    from kolibri_android.template_db import copy_template_databases
+
+    copy_template_databases(template_dir, {kolibri_home!r}, {version_name!r}, {version_code!r})
+
+from kolibri_android.plugin_config import update_plugins
+
+update_plugins()
+
+from kolibri.utils.main import initialize
+
+initialize()
+print(json.dumps({{"elapsed": time.perf_counter() - start}}))
+"""
+
+
+def run_first_launch(tmpdir, template_dir, stamp):
+    kolibri_home = os.path.join(tmpdir, "home")
+    shutil.rmtree(kolibri_home, ignore_errors=True)
+
+    # Kolibri deletes the provisioning file once it's been used.
+    provision_file = os.path.join(tmpdir, "automatic_provision.json")
+    shutil.copyfile(PROVISION_FILE, provision_file)
+
+    env = os.environ.copy()
+    env.update(
+        {
+            "KOLIBRI_HOME": kolibri_home,
+            "KOLIBRI_AUTOMATIC_PROVISION_FILE": provision_file,
+            "DJANGO_SETTINGS_MODULE": "kolibri_android.kolibri_extra.settings",
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [os.fspath(PYTHON_SRC_DIR), env.get("PYTHONPATH")])
+            ),
+        }
+    )
+    code = CHILD_CODE.format(
+        template_dir=template_dir,
+        kolibri_home=kolibri_home,
+        version_name=stamp["version_name"],
+        version_code=stamp["version_code"],
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+    )
+    # Kolibri may print to stdout, so only parse the last line.
+    return json.loads(proc.stdout.strip().splitlines()[-1])["elapsed"]
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("template", help="template directory created by templatedb.py")
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of runs per mode (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    template_dir = os.path.abspath(args.template)
+    stamp = read_template_stamp(template_dir)
+
+    modes = (("migrate", None), ("template", template_dir))
+    results = {mode: [] for mode, _ in modes}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Alternate the modes so they're equally affected by host load.
+        for _ in range(args.runs):
+            for mode, mode_template_dir in modes:
+                results[mode].append(run_first_launch(tmpdir, mode_template_dir, stamp))
+
+    for mode, times in results.items():
+        print(
+            f"{mode}: min {min(times):.3f}s, "
+            f"median {statistics.median(times):.3f}s, "
+            f"max {max(times):.3f}s"
+        )
+
+    saved = statistics.median(results["migrate"]) - statistics.median(
+        results["template"]
+    )
+    print(f"Median first launch time saved by the template: {saved:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
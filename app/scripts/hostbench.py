@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Benchmark the app's Python layer on a Linux host
+
+Each run starts a fresh Python process with the host Java classes from
+kolibri_android/host_java.py, initializes Kolibri with
+kolibri_utils.initialize like KolibriUtils.java does and starts the
+server with ServerProcessBus like KolibriService.java does. The startup
+phases are timed, the requests recorded in a HAR file are replayed
+against the server and the process RSS is read once they've been
+served. The python sources are copied to a temporary directory like the
+APK extracts them since Kolibri deletes the provisioning file once it's
+been used. Kolibri must be installed in the host Python environment or
+be in an extracted package root given with --pkgroot.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+
+from poolbench import get_free_port
+from poolbench import load_har_paths
+
+PYTHON_SRC_DIR = Path(__file__).absolute().parent.parent / "src/main/python"
+
+CHILD_CODE = """
+import json
+import os
+import statistics
+import time
+
+start = time.perf_counter()
+
+from kolibri_android.kolibri_utils import initialize
+
+initialize(
+    kolibri_home={kolibri_home!r},
+    kolibri_run_mode="hostbench",
+    version_name="hostbench",
+    version_code=1,
+    timezone="UTC",
+    node_id="",
+    cpu_count=os.cpu_count(),
+)
+initialized = time.perf_counter()
+
+from kolibri_android.server import ServerProcessBus
+
+bus = ServerProcessBus(port={port}, zip_port={zip_port}, enable_zeroconf=False)
+bus.start()
+started = time.perf_counter()
+
+from poolbench import replay
+from poolbench import wait_for_server
+import urllib.request
+from http.cookiejar import CookieJar
+
+base_url = bus.get_url().rstrip("/")
+wait_for_server(base_url + "/")
+ready = time.perf_counter()
+
+opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+first_replay, _ = replay(opener, base_url, {paths!r})
+second_replay, fetches = replay(opener, base_url, {paths!r})
+
+from kolibri_android.memory import get_rss
+
+rss = get_rss()
+bus.stop()
+
+print(
+    json.dumps(
+        {{
+            "initialize": initialized - start,
+            "bus_start": started - initialized,
+            "first_response": ready - start,
+            "first_replay": first_replay,
+            "second_replay": second_replay,
+            "request_latency": statistics.median(fetch[0] for fetch in fetches),
+            "rss_mib": rss / (1 << 20),
+        }}
+    )
+)
+"""
+
+METRICS = [
+    ("initialize", "s"),
+    ("bus_start", "s"),
+    ("first_response", "s"),
+    ("first_replay", "s"),
+    ("second_replay", "s"),
+    ("request_latency", "s"),
+    ("rss_mib", " MiB"),
+]
+
+
+def run_app(python_dir, kolibri_home, pkgroot, paths, verbose=False):
+    env = os.environ.copy()
+    pythonpath = [python_dir, os.path.dirname(os.path.abspath(__file__))]
+    if pkgroot is not None:
+        pythonpath.insert(0, os.fspath(pkgroot / "common"))
+    if env.get("PYTHONPATH"):
+        pythonpath.append(env["PYTHONPATH"])
+    env.update(
+        {
+            "KOLIBRI_ANDROID_JAVA_BACKEND": "host",
+            "PYTHONPATH": os.pathsep.join(pythonpath),
+        }
+    )
+    code = CHILD_CODE.format(
+        kolibri_home=kolibri_home,
+        port=get_free_port(),
+        zip_port=get_free_port(),
+        paths=paths,
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=None if verbose else subprocess.DEVNULL,
+        universal_newlines=True,
+    )
+    # Kolibri may print to stdout, so only parse the last line.
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--home", help="KOLIBRI_HOME directory to copy for each run")
+    ap.add_argument("--har", help="HAR file of a page load to replay")
+    ap.add_argument(
+        "-p",
+        "--pkgroot",
+        type=Path,
+        help="extracted package root containing Kolibri",
+    )
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=3,
+        help="number of runs (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="show the app's log messages",
+    )
+    args = ap.parse_args()
+
+    paths = load_har_paths(args.har) if args.har else ["/"]
+    pkgroot = args.pkgroot.resolve() if args.pkgroot else None
+
+    results = {name: [] for name, _ in METRICS}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        python_dir = os.path.join(tmpdir, "python")
+        shutil.copytree(
+            PYTHON_SRC_DIR,
+            python_dir,
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        for run in range(args.runs):
+            kolibri_home = os.path.join(tmpdir, f"home{run}")
+            if args.home:
+                shutil.copytree(args.home, kolibri_home)
+            result = run_app(python_dir, kolibri_home, pkgroot, paths, args.verbose)
+            for name, _ in METRICS:
+                results[name].append(result[name])
+
+    print(f"Replayed {len(paths)} requests in {args.runs} runs")
+    for name, unit in METRICS:
+        values = results[name]
+        print(
+            f"{name}: min {min(values):.3f}{unit}, "
+            f"median {statistics.median(values):.3f}{unit}, "
+            f"max {max(values):.3f}{unit}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Find unused python packages by tracing imports of the app entry points
+
+The app's python entry points are run on the host from the extracted
+python packages with the import tracer from kolibri_android/profiling.py
+installed and the host Java classes from kolibri_android/host_java.py:
+Kolibri is initialized with kolibri_utils.initialize, the app's
+ServerProcessBus is started and a page load recorded in a HAR file is
+replayed against it. The python sources are copied to a temporary
+directory like the APK extracts them since Kolibri deletes the
+provisioning file once it's been used.
+
+Every package and module file in the scanned directories that was never
+loaded is a removal candidate. The candidates are written as glob
+patterns for prunepackages.py --remove-list along with an estimate of
+the compressed bytes they take in the APK. Modules can be imported in
+code paths the trace doesn't cover, so review the candidates and check
+them with prunepackages.py --dry-run --report before removing anything.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zlib
+from argparse import ArgumentParser
+from pathlib import Path
+
+from poolbench import get_free_port
+from poolbench import load_har_paths
+
+PYTHON_SRC_DIR = Path(__file__).absolute().parent.parent / "src/main/python"
+
+logger = logging.getLogger("importtrace")
+
+# Directories relative to the package root whose packages are checked.
+# Kolibri's own packages and plugins are loaded through hooks and
+# templates that the trace may not reach, so only the vendored
+# distributions are checked by default.
+DEFAULT_SCAN_DIRS = ["common/kolibri/dist"]
+
+# Directory names that are never candidates. Django finds migrations
+# modules by listing the migrations packages rather than importing them.
+KEEP_NAMES = {"migrations"}
+
+CHILD_CODE = """
+import json
+import sys
+import time
+import urllib.request
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+
+from kolibri_android.profiling import ImportTracer
+
+tracer = ImportTracer()
+tracer.install()
+
+from kolibri_android.kolibri_utils import initialize
+
+initialize(
+    kolibri_home={kolibri_home!r},
+    kolibri_run_mode="importtrace",
+    version_name="importtrace",
+    version_code=1,
+    timezone="UTC",
+    node_id="",
+)
+
+from kolibri_android.server import ServerProcessBus
+
+bus = ServerProcessBus(port={port}, zip_port={zip_port}, enable_zeroconf=False)
+bus.start()
+
+opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+base_url = "http://127.0.0.1:{port}"
+deadline = time.monotonic() + 120
+while True:
+    try:
+        opener.open(base_url + "/").read()
+        break
+    except HTTPError:
+        break
+    except OSError:
+        if time.monotonic() > deadline:
+            raise
+        time.sleep(0.5)
+
+for path in {paths!r}:
+    try:
+        opener.open(base_url + path).read()
+    except HTTPError:
+        pass
+
+bus.stop()
+tracer.uninstall()
+
+modules = {{
+    name: getattr(module, "__file__", None)
+    for name, module in list(sys.modules.items())
+}}
+with open({output!r}, "w") as f:
+    json.dump(
+        {{"modules": modules, "imports": [record[1] for record in tracer.records]}},
+        f,
+        indent=2,
+        sort_keys=True,
+    )
+"""
+
+
+def run_trace(pkgroot, python_dir, kolibri_home, paths, output):
+    """Run the entry points under the import tracer writing the trace JSON"""
+    env = os.environ.copy()
+    env.update(
+        {
+            "KOLIBRI_ANDROID_JAVA_BACKEND": "host",
+            "PYTHONPATH": os.pathsep.join([os.fspath(pkgroot / "common"), python_dir]),
+        }
+    )
+    code = CHILD_CODE.format(
+        kolibri_home=kolibri_home,
+        port=get_free_port(),
+        zip_port=get_free_port(),
+        paths=paths,
+        output=os.fspath(output),
+    )
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+def get_loaded_files(trace, pkgroot):
+    """Returns the real paths of the loaded module files in the package root"""
+    common_dir = os.path.realpath(pkgroot / "common")
+    loaded = set()
+    for path in trace["modules"].values():
+        if not path:
+            continue
+        path = os.path.realpath(path)
+        if path.startswith(common_dir + os.sep):
+            loaded.add(path)
+    return loaded
+
+
+def get_loaded_dirs(loaded_files):
+    """Returns every directory containing a loaded module file"""
+    loaded_dirs = set()
+    for path in loaded_files:
+        parent = os.path.dirname(path)
+        while parent not in loaded_dirs and len(parent) > 1:
+            loaded_dirs.add(parent)
+            parent = os.path.dirname(parent)
+    return loaded_dirs
+
+
+def find_candidates(pkgroot, scan_dir, loaded_files):
+    """Find the packages and modules in scan_dir that were never loaded
+
+    Yields paths of the unused package directories and module files. The
+    packages aren't descended into.
+    """
+    loaded_dirs = get_loaded_dirs(loaded_files)
+    stack = [os.path.realpath(pkgroot / scan_dir)]
+    while stack:
+        root = stack.pop()
+        with os.scandir(root) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.name in KEEP_NAMES or entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path in loaded_dirs:
+                    stack.append(entry.path)
+                elif os.path.exists(os.path.join(entry.path, "__init__.py")):
+                    yield entry.path
+            elif entry.name.endswith(".py") and entry.path not in loaded_files:
+                if entry.name != "__init__.py":
+                    yield entry.path
+
+
+def measure(path):
+    """Returns the files, bytes and compressed bytes of a file or tree"""
+    if os.path.isdir(path):
+        filenames = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        ]
+    else:
+        filenames = [path]
+
+    size = 0
+    compressed = 0
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            data = f.read()
+        size += len(data)
+        compressed += len(zlib.compress(data, 6))
+    return len(filenames), size, compressed
+
+
+def write_candidates(pkgroot, candidates, path):
+    """Write the candidates as a remove list returning the totals"""
+    totals = [0, 0, 0]
+    lines = []
+    for candidate in candidates:
+        files, size, compressed = measure(candidate)
+        totals = [totals[0] + files, totals[1] + size, totals[2] + compressed]
+        relpath = Path(candidate).relative_to(pkgroot.resolve()).as_posix()
+        lines.append(f"# {files} files, {size} bytes, {compressed} compressed")
+        lines.append(relpath)
+
+    with open(path, "w") as f:
+        f.write("# Unused package candidates found by importtrace.py\n")
+        f.write(
+            f"# Total {totals[0]} files, {totals[1]} bytes, "
+            f"{totals[2]} compressed\n"
+        )
+        for line in lines:
+            f.write(f"{line}\n")
+    return totals
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        "-p",
+        "--pkgroot",
+        default=Path("."),
+        type=Path,
+        help="package root directory",
+    )
+    ap.add_argument("--home", help="KOLIBRI_HOME directory to copy")
+    ap.add_argument("--har", help="HAR file of a page load to replay")
+    ap.add_argument(
+        "--scan-dir",
+        action="append",
+        help=(
+            "directory relative to the package root to check, can be repeated "
+            f"(default: {', '.join(DEFAULT_SCAN_DIRS)})"
+        ),
+    )
+    ap.add_argument(
+        "--trace",
+        type=Path,
+        help="existing trace JSON to use instead of running the entry points",
+    )
+    ap.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("import-trace.json"),
+        help="path to write the trace JSON (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-c",
+        "--candidates",
+        type=Path,
+        default=Path("prune-candidates.txt"),
+        help="path to write the removal candidates (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    pkgroot = args.pkgroot.resolve()
+
+    trace_path = args.trace
+    if trace_path is None:
+        paths = load_har_paths(args.har) if args.har else ["/"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            python_dir = os.path.join(tmpdir, "python")
+            shutil.copytree(
+                PYTHON_SRC_DIR,
+                python_dir,
+                ignore=shutil.ignore_patterns("__pycache__"),
+            )
+            kolibri_home = os.path.join(tmpdir, "home")
+            if args.home:
+                shutil.copytree(args.home, kolibri_home)
+            logger.info(f"Tracing entry points replaying {len(paths)} requests")
+            run_trace(pkgroot, python_dir, kolibri_home, paths, args.output)
+        trace_path = args.output
+
+    with open(trace_path, "r") as f:
+        trace = json.load(f)
+    loaded_files = get_loaded_files(trace, pkgroot)
+    logger.info(
+        f"{len(trace['modules'])} modules loaded, {len(loaded_files)} from {pkgroot}"
+    )
+
+    candidates = []
+    for scan_dir in args.scan_dir or DEFAULT_SCAN_DIRS:
+        candidates += find_candidates(pkgroot, scan_dir, loaded_files)
+    files, size, compressed = write_candidates(pkgroot, candidates, args.candidates)
+    logger.info(
+        f"Wrote {len(candidates)} candidates to {args.candidates}: {files} files, "
+        f"{size} bytes, about {compressed} bytes less in the APK"
+    )
+    logger.info(
+        "Check them with: prunepackages.py --pkgroot "
+        f"{pkgroot} --remove-list {args.candidates} --dry-run --json-report REPORT"
+    )
+
+
+if __name__ == "__main__":
+    main()
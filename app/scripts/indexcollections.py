@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Compile the content collection manifests into an index
+
+The JSON manifests in the collections directory are written to a single
+index file read by kolibri_android.collections_index at runtime.
+"""
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src/main/python")
+)
+from kolibri_android.collections_index import COLLECTIONS_INDEX_FILENAME  # noqa: E402
+from kolibri_android.collections_index import write_collections_index  # noqa: E402
+
+
+def read_manifests(collections_dir):
+    manifests = {}
+    for path in sorted(collections_dir.glob("*.json")):
+        with path.open("r") as f:
+            manifests[path.stem] = json.load(f)
+    return manifests
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("collections", type=Path, help="collections directory")
+    ap.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help=(
+            f"index path (default: {COLLECTIONS_INDEX_FILENAME} next to the "
+            "collections directory)"
+        ),
+    )
+    args = ap.parse_args()
+
+    output = args.output
+    if output is None:
+        output = args.collections.resolve().parent / COLLECTIONS_INDEX_FILENAME
+
+    manifests = read_manifests(args.collections)
+    write_collections_index(output, manifests)
+    print(f"Wrote {len(manifests)} collection manifests to {output}")
+
+
+if __name__ == "__main__":
+    main()
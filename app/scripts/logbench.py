@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark log record throughput for the logging formatters
+
+Records are logged through a file handler and a handler standing in for
+the Android log, which formats records and discards them. This is done
+with the standard %-style formatters used by the original logging
+configuration, the equivalent kolibri_android formatters and the JSON
+lines formatter. A share of the records come from a noisy logger, which
+is rate limited like kolibri.core.tasks.worker except with the original
+standard formatters. Throughput is reported in records per second.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src/main/python")
+)
+from kolibri_android.logging_utils import FullFormatter  # noqa: E402
+from kolibri_android.logging_utils import JSONFormatter  # noqa: E402
+from kolibri_android.logging_utils import RateLimitFilter  # noqa: E402
+from kolibri_android.logging_utils import SimpleFormatter  # noqa: E402
+
+FULL_FORMAT = "%(asctime)s %(levelname)-8s %(name)s: %(message)s"
+SIMPLE_FORMAT = "%(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class DiscardHandler(logging.Handler):
+    """Handler formatting records without writing them"""
+
+    def emit(self, record):
+        self.format(record)
+
+
+def get_formatters(mode):
+    """Returns the (file, android) formatters for a mode"""
+    if mode == "stdlib":
+        return (
+            logging.Formatter(FULL_FORMAT, DATE_FORMAT),
+            logging.Formatter(SIMPLE_FORMAT),
+        )
+    if mode == "fast":
+        return FullFormatter(), SimpleFormatter()
+    if mode == "json":
+        return JSONFormatter(), SimpleFormatter()
+    raise ValueError(f"Unknown mode {mode}")
+
+
+def benchmark_mode(log_dir, mode, records, noisy_share, rate_limit):
+    file_formatter, android_formatter = get_formatters(mode)
+    file_handler = logging.FileHandler(os.path.join(log_dir, f"{mode}.txt"))
+    file_handler.setFormatter(file_formatter)
+    android_handler = DiscardHandler()
+    android_handler.setFormatter(android_formatter)
+
+    root = logging.getLogger("logbench")
+    root.propagate = False
+    root.setLevel(logging.INFO)
+    root.handlers = [file_handler, android_handler]
+
+    app_logger = root.getChild("app")
+    noisy_logger = root.getChild("worker")
+    noisy_logger.filters = []
+    if rate_limit and mode != "stdlib":
+        noisy_logger.addFilter(RateLimitFilter(rate=10, burst=50))
+
+    noisy_every = round(1 / noisy_share) if noisy_share > 0 else 0
+    start = time.perf_counter()
+    for i in range(records):
+        if noisy_every and i % noisy_every == 0:
+            noisy_logger.info("Job %s changed state to %s", i, "RUNNING")
+        else:
+            app_logger.info("Served %s with status %d", f"/api/content/{i}", 200)
+    elapsed = time.perf_counter() - start
+
+    file_handler.close()
+    root.handlers = []
+    return elapsed
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        "-n",
+        "--records",
+        type=int,
+        default=100000,
+        help="number of records to log per mode (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--noisy-share",
+        type=float,
+        default=0.5,
+        help="fraction of records from the noisy logger (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--no-rate-limit",
+        dest="rate_limit",
+        action="store_false",
+        help="don't rate limit the noisy logger",
+    )
+    args = ap.parse_args()
+
+    print(f"{'mode':<8} {'records/s':>12} {'time':>9}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mode in ("stdlib", "fast", "json"):
+            elapsed = benchmark_mode(
+                tmpdir, mode, args.records, args.noisy_share, args.rate_limit
+            )
+            print(f"{mode:<8} {args.records / elapsed:>12.0f} {elapsed:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Report the memory shed for each Android trim memory level
+
+Kolibri is initialized with kolibri_utils.initialize and the app's
+ServerProcessBus is started in this process with the host Java classes
+from kolibri_android/host_java.py and a copy of the given KOLIBRI_HOME.
+The server is optionally loaded by replaying a HAR file, and then each
+trim level is applied in turn with ServerProcessBus.trim_memory, resuming
+paused components between levels. The process RSS before and after each
+step is reported. ZeroConf isn't started on the host, so it has no step
+here. The script fails if any level other than RUNNING_CRITICAL pauses
+the task workers, since Android sends UI_HIDDEN whenever the user leaves
+the app. Kolibri must be installed in the host Python environment.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import urllib.request
+from argparse import ArgumentParser
+from http.cookiejar import CookieJar
+
+from poolbench import get_free_port
+from poolbench import load_har_paths
+from poolbench import replay
+from poolbench import wait_for_server
+
+PYTHON_SRC_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../src/main/python"
+)
+
+LEVEL_NAMES = [
+    "RUNNING_MODERATE",
+    "RUNNING_LOW",
+    "RUNNING_CRITICAL",
+    "UI_HIDDEN",
+    "BACKGROUND",
+    "MODERATE",
+    "COMPLETE",
+]
+
+# Steps that pause components and the only level that should run them.
+PAUSE_STEPS = {"tasks", "zeroconf"}
+PAUSE_LEVEL_NAME = "RUNNING_CRITICAL"
+
+
+def format_mib(value):
+    return f"{value / (1 << 20):>8.1f}" if value is not None else f"{'?':>8}"
+
+
+def start_bus(python_dir, kolibri_home):
+    sys.path.insert(0, python_dir)
+    os.environ["KOLIBRI_ANDROID_JAVA_BACKEND"] = "host"
+
+    from kolibri_android.kolibri_utils import initialize
+
+    initialize(
+        kolibri_home=kolibri_home,
+        kolibri_run_mode="memtrim",
+        version_name="memtrim",
+        version_code=1,
+        timezone="UTC",
+        node_id="",
+    )
+
+    from kolibri_android.server import ServerProcessBus
+
+    bus = ServerProcessBus(
+        port=get_free_port(), zip_port=get_free_port(), enable_zeroconf=False
+    )
+    bus.start()
+    return bus
+
+
+def trim_levels(bus):
+    """Apply each trim level returning (level, step, before, after) rows"""
+    from kolibri_android import memory
+
+    rows = []
+    for name in LEVEL_NAMES:
+        level = getattr(memory, f"TRIM_MEMORY_{name}")
+        for step, before, after in bus.trim_memory(level, wait=True):
+            rows.append((name, step, before, after))
+        bus.memory_pressure.resume()
+    return rows
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", nargs="?", help="KOLIBRI_HOME directory to copy")
+    ap.add_argument("--har", help="HAR file of a page load to replay first")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Kolibri deletes the provisioning file once it's been used, so
+        # run from a copy of the python sources like the APK extracts them.
+        python_dir = os.path.join(tmpdir, "python")
+        shutil.copytree(
+            PYTHON_SRC_DIR,
+            python_dir,
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        kolibri_home = os.path.join(tmpdir, "home")
+        if args.home:
+            shutil.copytree(args.home, kolibri_home)
+
+        bus = start_bus(python_dir, kolibri_home)
+        try:
+            base_url = bus.get_url().rstrip("/")
+            wait_for_server(base_url + "/")
+            if args.har:
+                opener = urllib.request.build_opener(
+                    urllib.request.HTTPCookieProcessor(CookieJar())
+                )
+                replay(opener, base_url, load_har_paths(args.har))
+
+            rows = trim_levels(bus)
+        finally:
+            bus.stop()
+
+    print(f"{'level':<18} {'step':<12} {'before':>8} {'after':>8}  (MiB)")
+    for name, step, before, after in rows:
+        print(f"{name:<18} {step:<12} {format_mib(before)} {format_mib(after)}")
+
+    paused = sorted(
+        {
+            f"{name} ran {step}"
+            for name, step, _, _ in rows
+            if step in PAUSE_STEPS and name != PAUSE_LEVEL_NAME
+        }
+    )
+    if paused:
+        sys.exit(f"Components paused outside {PAUSE_LEVEL_NAME}: {', '.join(paused)}")
+
+
+if __name__ == "__main__":
+    main()
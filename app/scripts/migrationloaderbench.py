@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark loading the Django migration graph with the bytecode cache
+
+On the device the extracted migrations packages have no compiled
+modules, so Django compiles every migration module when it loads the
+migration graph unless the bytecode cache from
+kolibri_android/bytecode_cache.py is enabled. Each run initializes
+Kolibri in a fresh Python process with a copy of the given KOLIBRI_HOME
+and times constructing a MigrationLoader. Without the cache, bytecode is
+neither read nor written, as on the device. With the cache, the first
+run compiles and writes the cache like a first launch and the remaining
+runs are second launches. Kolibri must be installed in the host Python
+environment.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from shutil import copytree
+
+PYTHON_SRC_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../src/main/python"
+)
+
+CHILD_CODE = """
+import json
+import sys
+
+if {use_cache!r}:
+    from kolibri_android.bytecode_cache import enable_bytecode_cache
+
+    enable_bytecode_cache({kolibri_home!r}, "migrationloaderbench", 1)
+else:
+    # Look for bytecode in an empty directory and don't write any so
+    # every module is compiled from source.
+    sys.pycache_prefix = {empty_dir!r}
+    sys.dont_write_bytecode = True
+
+import time
+
+from kolibri.utils.main import initialize
+
+initialize(skip_update=True)
+
+from django.db.migrations.loader import MigrationLoader
+
+start = time.perf_counter()
+loader = MigrationLoader(None, ignore_no_migrations=True)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "migrations": len(loader.disk_migrations)}}))
+"""
+
+
+def run_loader(kolibri_home, tmpdir, use_cache):
+    env = os.environ.copy()
+    env.update(
+        {
+            "KOLIBRI_HOME": kolibri_home,
+            "DJANGO_SETTINGS_MODULE": "kolibri_android.kolibri_extra.settings",
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [PYTHON_SRC_DIR, env.get("PYTHONPATH")])
+            ),
+        }
+    )
+    code = CHILD_CODE.format(
+        use_cache=use_cache,
+        kolibri_home=kolibri_home,
+        empty_dir=os.path.join(tmpdir, "empty"),
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+    )
+    # Kolibri may print to stdout, so only parse the last line.
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", help="KOLIBRI_HOME directory containing db.sqlite3")
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of runs per mode (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kolibri_home = os.path.join(tmpdir, "KOLIBRI_DATA")
+        copytree(args.home, kolibri_home)
+
+        first = run_loader(kolibri_home, tmpdir, use_cache=True)
+        print(
+            f"Loaded {first['migrations']} migrations, "
+            f"{first['elapsed']:.3f}s writing the cache"
+        )
+
+        results = {"source": [], "cache": []}
+        # Alternate the modes so they're equally affected by host load.
+        for _ in range(args.runs):
+            for mode in results:
+                result = run_loader(kolibri_home, tmpdir, mode == "cache")
+                results[mode].append(result["elapsed"])
+
+    for mode, times in results.items():
+        print(
+            f"{mode}: min {min(times):.3f}s, "
+            f"median {statistics.median(times):.3f}s, "
+            f"max {max(times):.3f}s"
+        )
+
+    saved = statistics.median(results["source"]) - statistics.median(results["cache"])
+    print(f"Median migration loader time saved by the cache: {saved:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Benchmark page load time for different server thread pool sizes
+
+A page load is replayed from a HAR file recorded with the WebView remote
+debugging tools or any browser. For each thread pool size, a Kolibri
+server is started with a copy of the given KOLIBRI_HOME and the recorded
+requests are replayed with the same concurrency as a browser. The time
+until all requests of the page load have completed approximates the
+time to interactive. Kolibri must be installed in the host Python
+environment.
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.cookiejar import CookieJar
+from shutil import copytree
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+
+# Chromium opens up to 6 connections per host.
+BROWSER_CONNECTIONS = 6
+
+
+def load_har_paths(har_path):
+    """Returns the request paths from a HAR file in request order"""
+    with open(har_path, "r") as f:
+        har = json.load(f)
+
+    entries = sorted(
+        har["log"]["entries"], key=lambda entry: entry.get("startedDateTime", "")
+    )
+    paths = []
+    for entry in entries:
+        request = entry["request"]
+        if request.get("method", "GET") != "GET":
+            continue
+        url = urlsplit(request["url"])
+        if url.scheme not in ("http", "https"):
+            continue
+        paths.append(url.path + (f"?{url.query}" if url.query else ""))
+    return paths
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(base_url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url, timeout=5):
+                return
+        except HTTPError:
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} did not start")
+
+
+def fetch(opener, url):
+    """Fetch a URL returning the latency, response size and status"""
+    start = time.perf_counter()
+    try:
+        with opener.open(url) as response:
+            size = len(response.read())
+            status = response.status
+    except HTTPError as err:
+        size = len(err.read())
+        status = err.code
+    return time.perf_counter() - start, size, status
+
+
+def replay(opener, base_url, paths):
+    """Replay the requests of a page load
+
+    Returns the total elapsed time and a list of (latency, size, status)
+    tuples for each request.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS) as executor:
+        results = list(executor.map(lambda path: fetch(opener, base_url + path), paths))
+    return time.perf_counter() - start, results
+
+
+@contextmanager
+def run_server(kolibri_home, env=None):
+    """Run a Kolibri server and yield its base URL and a cookie keeping opener"""
+    port = get_free_port()
+    server_env = os.environ.copy()
+    server_env["KOLIBRI_HOME"] = kolibri_home
+    server_env.update(env or {})
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "kolibri",
+            "start",
+            "--foreground",
+            f"--port={port}",
+        ],
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_for_server(base_url + "/")
+
+        # Keep cookies like the WebView so the session is reused.
+        opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar())
+        )
+        yield opener, base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def benchmark_pool_size(kolibri_home, pool_size, paths, runs):
+    env = {"KOLIBRI_CHERRYPY_THREAD_POOL": str(pool_size)}
+    with run_server(kolibri_home, env) as (opener, base_url):
+        # Warm up server side caches so each run measures the same thing.
+        replay(opener, base_url, paths)
+
+        return [replay(opener, base_url, paths) for _ in range(runs)]
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", help="KOLIBRI_HOME directory to serve")
+    ap.add_argument("har", help="HAR file of a recorded page load")
+    ap.add_argument(
+        "-s",
+        "--sizes",
+        default="2,4,6,8",
+        help="comma separated thread pool sizes (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of page loads per size (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    paths = load_har_paths(args.har)
+    print(f"Replaying {len(paths)} requests", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kolibri_home = os.path.join(tmpdir, "KOLIBRI_DATA")
+        copytree(args.home, kolibri_home)
+
+        print(f"{'threads':>7} {'median':>8} {'min':>8} {'max':>8} {'bytes':>10}")
+        for pool_size in (int(size) for size in args.sizes.split(",")):
+            results = benchmark_pool_size(kolibri_home, pool_size, paths, args.runs)
+            times = [elapsed for elapsed, _ in results]
+            size = sum(size for _, size, _ in results[-1][1])
+            print(
+                f"{pool_size:>7} {statistics.median(times):>7.3f}s "
+                f"{min(times):>7.3f}s {max(times):>7.3f}s {size:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
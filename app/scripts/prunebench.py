@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Benchmark pruning the extracted python packages
+
+A synthetic package tree the size of the extracted Kolibri packages is
+generated, or an existing package root is used, and copied once per run
+for each implementation. The previous implementation, which globbed the
+whole tree once per pattern and walked it again for the migrations
+modules, is kept here for comparison with the single pass prune() in
+prunepackages.py. Both must leave the same files behind.
+"""
+import fnmatch
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from glob import iglob
+from pathlib import Path
+from shutil import copytree
+from shutil import rmtree
+
+from prunepackages import INCLUDE_LOCALES_DIRS
+from prunepackages import prune
+from prunepackages import REMOVE_GLOBS
+from prunepackages import REMOVE_LOCALES_DIRS
+
+LOCALES = ["ar", "bn", "de", "en", "es", "fr", "hi", "pt_BR", "sw", "zh_Hans"]
+EXTRA_LOCALES = ["da", "el", "fi", "it", "ja", "ko", "nl", "pl", "ru", "sv", "tr"]
+
+
+def legacy_prune_locales(pkgroot):
+    include_locale_names = set(["en"])
+    for subdir in INCLUDE_LOCALES_DIRS:
+        locales_dir = pkgroot / subdir
+        include_locale_names.update(
+            entry.name for entry in locales_dir.iterdir() if entry.is_dir()
+        )
+
+    for subdir in REMOVE_LOCALES_DIRS:
+        for entry in (pkgroot / subdir).iterdir():
+            if entry.is_dir() and entry.name not in include_locale_names:
+                rmtree(entry)
+
+
+def legacy_prune(pkgroot):
+    legacy_prune_locales(pkgroot)
+
+    for pattern in REMOVE_GLOBS:
+        for match in iglob(f"{pkgroot}/{pattern}", recursive=True):
+            remove_path = Path(match)
+            if remove_path.is_dir():
+                rmtree(remove_path)
+            else:
+                os.unlink(remove_path)
+
+    for root, dirs, files in os.walk(pkgroot / "common"):
+        if os.path.basename(root) != "migrations":
+            continue
+        for filename in fnmatch.filter(files, "*.pyc"):
+            os.unlink(os.path.join(root, filename))
+
+
+def write_file(path, rng):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"#" * rng.randint(100, 4000))
+
+
+def create_rule_matches(pkgroot, rng):
+    """Create files matching the locale and pattern rules
+
+    Returns the number of files created.
+    """
+    created = 0
+    for subdir in INCLUDE_LOCALES_DIRS:
+        for locale in LOCALES:
+            write_file(pkgroot / subdir / locale / "LC_MESSAGES/django.mo", rng)
+            created += 1
+    for subdir in REMOVE_LOCALES_DIRS:
+        for locale in LOCALES + EXTRA_LOCALES:
+            for name in ("django.po", "django.mo"):
+                write_file(pkgroot / subdir / locale / "LC_MESSAGES" / name, rng)
+                created += 1
+
+    for pattern in REMOVE_GLOBS:
+        if pattern.startswith("**/"):
+            continue
+        path = pattern.replace("*", "x")
+        for i in range(20):
+            write_file(pkgroot / path / f"sub{i % 4}" / f"file{i}.py", rng)
+            created += 1
+    return created
+
+
+def create_tree(pkgroot, files, dirs):
+    """Create a package tree with about the given number of files and directories
+
+    Every rule has matches and the rest of the files are spread over
+    module packages with migrations and static assets.
+    """
+    rng = random.Random(0)
+    created = create_rule_matches(pkgroot, rng)
+
+    packages = max(1, dirs // 4)
+    modules = max(1, (files - created) // (packages * 3))
+    for i in range(packages):
+        package = pkgroot / "common/kolibri/dist" / f"package{i}"
+        for j in range(modules):
+            write_file(package / f"module{j}.py", rng)
+            write_file(package / "static" / f"bundle{j}.js", rng)
+            if j % 10 == 0:
+                write_file(package / "static" / f"bundle{j}.js.map", rng)
+            write_file(package / "migrations" / f"{j:04}_migration.py", rng)
+            if j % 2 == 0:
+                write_file(package / "migrations" / f"{j:04}_migration.pyc", rng)
+
+
+def count_tree(pkgroot):
+    files = 0
+    dirs = 0
+    for _, dirnames, filenames in os.walk(pkgroot):
+        files += len(filenames)
+        dirs += len(dirnames)
+    return files, dirs
+
+
+def list_tree(pkgroot):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), pkgroot)
+        for root, _, filenames in os.walk(pkgroot)
+        for name in filenames
+    )
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("pkgroot", nargs="?", type=Path, help="package root to copy")
+    ap.add_argument(
+        "--files",
+        type=int,
+        default=15000,
+        help="generated files (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--dirs",
+        type=int,
+        default=4000,
+        help="generated directories (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of runs (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = args.pkgroot
+        if source is None:
+            source = Path(tmpdir) / "source"
+            print("Generating package tree", file=sys.stderr)
+            create_tree(source, args.files, args.dirs)
+        files, dirs = count_tree(source)
+        print(f"Package tree with {files} files in {dirs} directories")
+
+        results = {"legacy": [], "single_pass": []}
+        trees = {}
+        for _ in range(args.runs):
+            for mode, func in (("legacy", legacy_prune), ("single_pass", prune)):
+                pkgroot = Path(tmpdir) / mode
+                rmtree(pkgroot, ignore_errors=True)
+                copytree(source, pkgroot, symlinks=True)
+                start = time.perf_counter()
+                func(pkgroot)
+                results[mode].append(time.perf_counter() - start)
+                trees[mode] = list_tree(pkgroot)
+
+        if trees["legacy"] != trees["single_pass"]:
+            sys.exit("The implementations left different files behind")
+        print(f"Both implementations kept {len(trees['legacy'])} files")
+
+    for mode, times in results.items():
+        print(
+            f"{mode}: min {min(times):.3f}s, "
+            f"median {statistics.median(times):.3f}s, "
+            f"max {max(times):.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
-import fnmatch
+import json
 import logging
 import os
+import re
 from argparse import ArgumentParser
-from glob import iglob
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from shutil import rmtree
 
 logger = logging.getLogger("prune")
 
@@ -72,35 +73,205 @@ REMOVE_GLOBS = [
 ]
 
 
+# Django migrations compiled modules. Chaquopy currently precompiles modules but also
+# keeps the original module for packages specified in extractPackages as is needed for
+# Django migrations packages. We don't want to globally disable precompiling since
+# it's useful for other packages, so we strip out the unwanted precompiled modules
+# here. The app compiles them into a bytecode cache in KOLIBRI_HOME at runtime instead.
+#
+# https://github.com/chaquo/chaquopy/issues/978
+REMOVE_MIGRATION_MODULES_GLOB = "common/**/migrations/*.pyc"
+
+# Report rule name for the locales removed from REMOVE_LOCALES_DIRS.
+LOCALES_RULE = "locales"
+
+# Number of matched files removed by each task in the thread pool.
+REMOVE_BATCH_SIZE = 64
+
+
 def get_locales(locales_dir):
     return (entry for entry in locales_dir.iterdir() if entry.is_dir())
 
 
-def prune_migration_modules(pkgroot, dry_run=False):
-    """Prune Django migrations compiled modules
+def glob_to_regex(pattern):
+    """Translate a glob pattern to a regular expression
+
+    The semantics match glob with recursive=True. Wildcards don't match
+    a / or a leading . and a ** component matches zero or more
+    directories.
+    """
+    components = pattern.split("/")
+    if components[-1] == "**":
+        raise ValueError(f"Pattern '{pattern}' can't end with **")
+
+    regex = ""
+    for component in components[:-1]:
+        if component == "**":
+            regex += r"(?:(?!\.)[^/]+/)*"
+        else:
+            regex += component_to_regex(component) + "/"
+    return regex + component_to_regex(components[-1])
+
+
+def component_to_regex(component):
+    regex = r"(?!\.)" if component[:1] in ("*", "?") else ""
+    for char in component:
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        else:
+            regex += re.escape(char)
+    return regex
+
+
+class PruneMatcher:
+    """Match paths relative to the package root against all patterns at once
+
+    Most paths don't match any pattern, so their names are first checked
+    against the last component of every pattern before the full paths are
+    matched.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._name_regex = re.compile(
+            "|".join(
+                component_to_regex(pattern.rsplit("/", 1)[-1])
+                for pattern in self.patterns
+            )
+        )
+        self._regex = re.compile(
+            "|".join(
+                f"(?P<r{i}>{glob_to_regex(pattern)})"
+                for i, pattern in enumerate(self.patterns)
+            )
+        )
+
+    def match(self, relpath, name):
+        """Returns the first pattern matching the path or None"""
+        if self._name_regex.fullmatch(name) is None:
+            return None
+        match = self._regex.fullmatch(relpath)
+        if match is None:
+            return None
+        return self.patterns[int(match.lastgroup[1:])]
+
+
+def find_removals(pkgroot, matcher, remove_locales_dirs, include_locale_names):
+    """Walk the package root once
+
+    Yields a tuple of the rule, path and whether it's a directory for each
+    path to remove. Removed directories aren't descended into and symbolic
+    links are removed rather than followed.
+    """
+    stack = [("", os.fspath(pkgroot))]
+    while stack:
+        relroot, root = stack.pop()
+        locales_dir = relroot[:-1] in remove_locales_dirs
+        with os.scandir(root) as entries:
+            for entry in entries:
+                relpath = relroot + entry.name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                rule = matcher.match(relpath, entry.name)
+                if (
+                    rule is None
+                    and is_dir
+                    and locales_dir
+                    and entry.name not in include_locale_names
+                ):
+                    rule = LOCALES_RULE
+                if rule is not None:
+                    yield rule, entry.path, is_dir
+                elif is_dir:
+                    stack.append((f"{relpath}/", entry.path))
+
+
+def remove_tree(rule, path, dry_run=False):
+    """Remove a directory tree
+
+    Returns a list of the rule, files and bytes removed.
+    """
+    files, size = _remove_tree(path, dry_run)
+    return [(rule, files, size)]
+
+
+def _remove_tree(path, dry_run):
+    # Like shutil.rmtree but the files are counted as they're removed.
+    files = 0
+    size = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdir_files, subdir_size = _remove_tree(entry.path, dry_run)
+                files += subdir_files
+                size += subdir_size
+                continue
+            files += 1
+            size += entry.stat(follow_symlinks=False).st_size
+            if not dry_run:
+                os.unlink(entry.path)
+    if not dry_run:
+        os.rmdir(path)
+    return files, size
+
 
-    Chaquopy currently precompiles modules but also keeps the original module for
-    packages specified in extractPackages as is needed for Django migrations packages.
-    We don't want to globally disable precompiling since it's useful for other packages,
-    so we strip out the unwanted precompiled modules here.
+def remove_files(removals, dry_run=False):
+    """Remove a batch of (rule, path) files
 
-    https://github.com/chaquo/chaquopy/issues/978
+    Returns a list of the rule, files and bytes removed for each file.
     """
-    common_dir = pkgroot / "common"
-    for root, dirs, files in os.walk(common_dir):
-        # If the directory appears to be a Django migrations package, delete the .pyc
-        # compiled modules.
-        if os.path.basename(root) != "migrations":
+    results = []
+    for rule, path in removals:
+        size = os.lstat(path).st_size
+        if not dry_run:
+            os.unlink(path)
+        results.append((rule, 1, size))
+    return results
+
+
+def submit_removals(executor, removals, dry_run=False):
+    """Submit removal tasks to the executor returning their futures"""
+    futures = []
+    batch = []
+    for rule, path, is_dir in removals:
+        if rule == LOCALES_RULE:
+            logger.info(f"Removing locale '{path}'")
+        elif is_dir:
+            logger.info(f"Removing matched directory '{path}'")
+        else:
+            logger.info(f"Removing matched file '{path}'")
+
+        if is_dir:
+            futures.append(executor.submit(remove_tree, rule, path, dry_run))
             continue
-        matches = fnmatch.filter(files, "*.pyc")
-        if matches:
-            logger.info(f"Removing {root} .pyc compiled python modules")
-            for filename in matches:
-                if not dry_run:
-                    os.unlink(os.path.join(root, filename))
+        batch.append((rule, path))
+        if len(batch) >= REMOVE_BATCH_SIZE:
+            futures.append(executor.submit(remove_files, batch, dry_run))
+            batch = []
+    if batch:
+        futures.append(executor.submit(remove_files, batch, dry_run))
+    return futures
 
 
-def prune(pkgroot, dry_run=False):
+def read_remove_list(path):
+    """Read glob patterns from a file, one per line
+
+    Blank lines and lines starting with # are ignored.
+    """
+    with open(path, "r") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def prune(pkgroot, dry_run=False, jobs=None, remove_globs=()):
+    """Prune the package root
+
+    The tree is walked once and the matched paths are removed by a pool of
+    threads as they're found. remove_globs are removed in addition to
+    REMOVE_GLOBS. Returns a report mapping each rule to the number of
+    paths, files and bytes it removed.
+    """
     include_locale_names = set(["en"])
     for subdir in INCLUDE_LOCALES_DIRS:
         locales_dir = pkgroot / subdir
@@ -109,31 +280,30 @@ def prune(pkgroot, dry_run=False):
 
     logger.info("Included locales: {}".format(include_locale_names))
 
-    for subdir in REMOVE_LOCALES_DIRS:
-        cleanup_dir = pkgroot / subdir
-        locales = get_locales(cleanup_dir)
-        remove_locales = (
-            locale for locale in locales if locale.name not in include_locale_names
-        )
-        for remove_locale in remove_locales:
-            logger.info("Removing locale '{}'".format(remove_locale))
-            if not dry_run:
-                rmtree(remove_locale)
+    patterns = REMOVE_GLOBS + list(remove_globs) + [REMOVE_MIGRATION_MODULES_GLOB]
+    matcher = PruneMatcher(patterns)
+    report = {
+        rule: {"paths": 0, "files": 0, "bytes": 0} for rule in [LOCALES_RULE] + patterns
+    }
 
-    for pattern in REMOVE_GLOBS:
-        logger.info(f"Matching pattern '{pattern}'")
-        for match in iglob(f"{pkgroot}/{pattern}", recursive=True):
-            remove_path = Path(match)
-            if remove_path.is_dir():
-                logger.info(f"Removing matched directory '{remove_path}'")
-                if not dry_run:
-                    rmtree(remove_path)
-            else:
-                logger.info(f"Removing matched file '{remove_path}'")
-                if not dry_run:
-                    os.unlink(remove_path)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        removals = find_removals(
+            pkgroot, matcher, set(REMOVE_LOCALES_DIRS), include_locale_names
+        )
+        futures = submit_removals(executor, removals, dry_run)
+        for future in as_completed(futures):
+            for rule, files, size in future.result():
+                rule_report = report[rule]
+                rule_report["paths"] += 1
+                rule_report["files"] += files
+                rule_report["bytes"] += size
 
-    prune_migration_modules(pkgroot, dry_run)
+    for rule, rule_report in report.items():
+        logger.info(
+            f"Rule '{rule}' removed {rule_report['files']} files "
+            f"({rule_report['bytes']} bytes)"
+        )
+    return report
 
 
 def main():
@@ -151,6 +321,22 @@ def main():
         type=Path,
         help="report file path",
     )
+    parser.add_argument(
+        "--json-report",
+        type=Path,
+        help="path to write the files and bytes removed by each rule as JSON",
+    )
+    parser.add_argument(
+        "--remove-list",
+        type=Path,
+        help="file of additional glob patterns to remove, one per line",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of removal threads (default: based on the CPU count)",
+    )
     parser.add_argument(
         "-n",
         "--dry-run",
@@ -170,7 +356,23 @@ def main():
         )
     logging.basicConfig(**logging_config)
 
-    prune(args.pkgroot.resolve(), args.dry_run)
+    remove_globs = read_remove_list(args.remove_list) if args.remove_list else []
+    report = prune(args.pkgroot.resolve(), args.dry_run, args.jobs, remove_globs)
+    if args.json_report:
+        args.json_report.parent.mkdir(parents=True, exist_ok=True)
+        with args.json_report.open("w") as f:
+            json.dump(
+                {
+                    "dry_run": args.dry_run,
+                    "rules": report,
+                    "total": {
+                        key: sum(rule_report[key] for rule_report in report.values())
+                        for key in ("paths", "files", "bytes")
+                    },
+                },
+                f,
+                indent=2,
+            )
 
 
 if __name__ == "__main__":
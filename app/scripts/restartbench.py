@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark restarting the Kolibri server bus cold and warm
+
+A cold start launches a new Kolibri server process and is timed until
+the server answers a request. A warm restart suspends an in-process bus
+to the IDLE state and starts it again like ServerProcessBus.suspend()
+and start() do. The suspend is timed separately from the resume, which
+is timed until the server answers a request. The in-process bus has the
+same plugins as ServerProcessBus but not the Android specific parts.
+Kolibri must be installed in the host Python environment.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from shutil import copytree
+
+from poolbench import run_server
+from poolbench import wait_for_server
+
+
+def create_bus():
+    from kolibri.utils.server import BaseKolibriProcessBus
+    from kolibri.utils.server import KolibriServerPlugin
+    from kolibri.utils.server import ProcessControlPlugin
+    from kolibri.utils.server import ServicesPlugin
+    from kolibri.utils.server import ZipContentServerPlugin
+
+    bus = BaseKolibriProcessBus()
+    for listener in list(bus.listeners["START"]):
+        plugin = getattr(listener, "__self__", None)
+        if isinstance(plugin, ProcessControlPlugin):
+            plugin.unsubscribe()
+    ServicesPlugin(bus).subscribe()
+    KolibriServerPlugin(bus, bus.port).subscribe()
+    ZipContentServerPlugin(bus, bus.zip_port).subscribe()
+    return bus
+
+
+def start_bus(bus):
+    bus.graceful()
+    wait_for_server(f"http://127.0.0.1:{bus.port}/")
+
+
+def benchmark_cold(kolibri_home, runs):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with run_server(kolibri_home):
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def benchmark_warm(runs):
+    from kolibri.utils.main import initialize
+
+    initialize()
+    bus = create_bus()
+    start_bus(bus)
+    try:
+        suspend = []
+        resume = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            bus.transition("IDLE")
+            suspend.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            start_bus(bus)
+            resume.append(time.perf_counter() - start)
+    finally:
+        bus.transition("EXITED")
+    return suspend, resume
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", nargs="?", help="KOLIBRI_HOME directory to copy")
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of restarts per path (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kolibri_home = os.path.join(tmpdir, "home")
+        if args.home:
+            copytree(args.home, kolibri_home)
+        os.environ["KOLIBRI_HOME"] = kolibri_home
+
+        # The cold runs come first so the home is initialized by the server
+        # process before Kolibri is loaded in this one.
+        print("Benchmarking cold restarts", file=sys.stderr)
+        cold = benchmark_cold(kolibri_home, args.runs)
+        print("Benchmarking warm restarts", file=sys.stderr)
+        suspend, resume = benchmark_warm(args.runs)
+
+    print(f"{'':<10} {'min':>9} {'median':>9} {'max':>9}")
+    for name, latencies in (("cold", cold), ("suspend", suspend), ("resume", resume)):
+        print(
+            f"{name:<10} "
+            f"{min(latencies) * 1000:>7.1f}ms "
+            f"{statistics.median(latencies) * 1000:>7.1f}ms "
+            f"{max(latencies) * 1000:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
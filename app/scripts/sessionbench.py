@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark request latency for the Android session engine modes
+
+A page load recorded in a HAR file is replayed against a host Kolibri
+server using the kolibri_android settings module for each session engine
+mode. Per request latencies are reported along with the number of server
+errors, which is where SQLite "database is locked" failures show up when
+the session and content queries contend for db.sqlite3. The script first
+checks that an unknown mode falls back to Kolibri's session engine. Kolibri
+must be installed in the host Python environment.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from shutil import copytree
+
+from poolbench import load_har_paths
+from poolbench import replay
+from poolbench import run_server
+
+PYTHON_SRC_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../src/main/python"
+)
+
+# Mode names for KOLIBRI_ANDROID_SESSION_ENGINE. The empty mode uses Kolibri's
+# session engine.
+SESSION_MODES = ["", "signed_cookies", "cache"]
+
+SETTINGS_CODE = """
+from kolibri.utils.env import set_env
+
+set_env()
+
+from django.conf import settings
+
+print(settings.SESSION_ENGINE)
+"""
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, round(fraction * (len(values) - 1)))
+    return values[index]
+
+
+def get_session_engine(kolibri_home, mode):
+    """Returns the session engine the settings module selects for a mode"""
+    env = os.environ.copy()
+    env.update(
+        {
+            "KOLIBRI_HOME": kolibri_home,
+            "DJANGO_SETTINGS_MODULE": "kolibri_android.kolibri_extra.settings",
+            "KOLIBRI_ANDROID_SESSION_ENGINE": mode,
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [PYTHON_SRC_DIR, os.environ.get("PYTHONPATH")])
+            ),
+        }
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", SETTINGS_CODE],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def check_unknown_mode(kolibri_home):
+    """Exit unless an unknown mode uses the default session engine"""
+    default_engine = get_session_engine(kolibri_home, "")
+    engine = get_session_engine(kolibri_home, "invalid")
+    if engine != default_engine:
+        sys.exit(f"Unknown session engine mode selected {engine}")
+
+
+def benchmark_mode(kolibri_home, mode, paths, runs):
+    env = {
+        "DJANGO_SETTINGS_MODULE": "kolibri_android.kolibri_extra.settings",
+        "KOLIBRI_ANDROID_SESSION_ENGINE": mode,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [PYTHON_SRC_DIR, os.environ.get("PYTHONPATH")])
+        ),
+    }
+    with run_server(kolibri_home, env) as (opener, base_url):
+        # The first page load creates the session.
+        replay(opener, base_url, paths)
+
+        results = []
+        for _ in range(runs):
+            _, requests = replay(opener, base_url, paths)
+            results += requests
+    return results
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", help="KOLIBRI_HOME directory to serve")
+    ap.add_argument("har", help="HAR file of a recorded page load")
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of page loads per mode (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    paths = load_har_paths(args.har)
+    print(f"Replaying {len(paths)} requests", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        check_unknown_mode(os.path.join(tmpdir, "settings"))
+
+        print(f"{'mode':<16} {'p50':>8} {'p95':>8} {'mean':>8} {'errors':>7}")
+        for mode in SESSION_MODES:
+            # Start each mode from the same database.
+            kolibri_home = os.path.join(tmpdir, mode or "default")
+            copytree(args.home, kolibri_home)
+
+            results = benchmark_mode(kolibri_home, mode, paths, args.runs)
+            latencies = [latency for latency, _, _ in results]
+            errors = sum(1 for _, _, status in results if status >= 500)
+            print(
+                f"{mode or 'default':<16} "
+                f"{percentile(latencies, 0.5) * 1000:>6.1f}ms "
+                f"{percentile(latencies, 0.95) * 1000:>6.1f}ms "
+                f"{statistics.mean(latencies) * 1000:>6.1f}ms "
+                f"{errors:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark the SQLite tuning profiles with a content browsing query mix
+
+A copy of a Kolibri db.sqlite3 with imported channels is opened with
+each profile's pragmas and several threads run a mix of the queries
+used when browsing content: listing a topic's children, listing
+available resources in a channel, title searches and looking up a
+resource's files. The p50 and p95 latencies for each query are reported
+per profile.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from shutil import copyfile
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src/main/python")
+)
+from kolibri_android.kolibri_extra.sqlite import apply_sqlite_profile  # noqa: E402
+from kolibri_android.kolibri_extra.sqlite import SQLITE_PROFILES  # noqa: E402
+
+QUERIES = {
+    "children": (
+        "SELECT id, title, kind, available FROM content_contentnode "
+        "WHERE parent_id = :node ORDER BY lft"
+    ),
+    "channel_resources": (
+        "SELECT id, title, kind FROM content_contentnode "
+        "WHERE channel_id = :channel AND available = 1 AND kind != 'topic' "
+        "ORDER BY lft LIMIT 25"
+    ),
+    "search": (
+        "SELECT id, title, kind FROM content_contentnode "
+        "WHERE available = 1 AND title LIKE :term LIMIT 50"
+    ),
+    "files": (
+        "SELECT f.id, f.preset, l.id, l.extension, l.file_size "
+        "FROM content_file f JOIN content_localfile l ON f.local_file_id = l.id "
+        "WHERE f.contentnode_id = :node"
+    ),
+}
+
+SEARCH_TERMS = ["%math%", "%science%", "%story%", "%the%", "%game%"]
+
+
+def load_samples(db_path, limit=1000):
+    conn = sqlite3.connect(db_path)
+    try:
+        topics = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM content_contentnode WHERE kind = 'topic' "
+                "ORDER BY random() LIMIT ?",
+                (limit,),
+            )
+        ]
+        resources = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM content_contentnode WHERE kind != 'topic' "
+                "ORDER BY random() LIMIT ?",
+                (limit,),
+            )
+        ]
+        channels = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT channel_id FROM content_contentnode"
+            )
+        ]
+    finally:
+        conn.close()
+    if not topics or not resources or not channels:
+        raise ValueError(f"{db_path} does not contain any content")
+    return topics, resources, channels
+
+
+def run_worker(db_path, profile, samples, iterations, seed, results, lock):
+    topics, resources, channels = samples
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        apply_sqlite_profile(conn.cursor(), profile)
+        latencies = {name: [] for name in QUERIES}
+        for _ in range(iterations):
+            name = rng.choice(list(QUERIES))
+            params = {
+                "node": rng.choice(topics if name == "children" else resources),
+                "channel": rng.choice(channels),
+                "term": rng.choice(SEARCH_TERMS),
+            }
+            start = time.perf_counter()
+            conn.execute(QUERIES[name], params).fetchall()
+            latencies[name].append(time.perf_counter() - start)
+    finally:
+        conn.close()
+
+    with lock:
+        for name, values in latencies.items():
+            results[name] += values
+
+
+def benchmark_profile(db_path, profile, samples, threads, iterations):
+    results = {name: [] for name in QUERIES}
+    lock = threading.Lock()
+    workers = [
+        threading.Thread(
+            target=run_worker,
+            args=(db_path, profile, samples, iterations, seed, results, lock),
+        )
+        for seed in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("db", help="path to a Kolibri db.sqlite3 with content")
+    ap.add_argument(
+        "-p",
+        "--profiles",
+        default=",".join(SQLITE_PROFILES),
+        help="comma separated profiles to test (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=4,
+        help="number of concurrent connections (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-n",
+        "--iterations",
+        type=int,
+        default=500,
+        help="queries per connection (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    samples = load_samples(args.db)
+
+    print(f"{'profile':<8} {'query':<18} {'p50':>9} {'p95':>9} {'mean':>9}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in args.profiles.split(","):
+            # Each profile gets a fresh copy since the journal mode is
+            # persistent.
+            db_path = os.path.join(tmpdir, f"{profile}.sqlite3")
+            copyfile(args.db, db_path)
+
+            results = benchmark_profile(
+                db_path, profile, samples, args.threads, args.iterations
+            )
+            for name, latencies in results.items():
+                if not latencies:
+                    continue
+                print(
+                    f"{profile:<8} {name:<18} "
+                    f"{percentile(latencies, 0.5) * 1000:>7.2f}ms "
+                    f"{percentile(latencies, 0.95) * 1000:>7.2f}ms "
+                    f"{statistics.mean(latencies) * 1000:>7.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
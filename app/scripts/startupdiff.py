@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Compare startup profile reports
+
+The reports are written to KOLIBRI_HOME/logs/startup-profile.json on the
+device when startup profiling is enabled. Enable it and pull a report
+with:
+
+    adb shell setprop debug.org.endlessos.key.profile_startup true
+    adb pull /sdcard/Android/data/org.endlessos.Key/files/KOLIBRI_DATA/logs/startup-profile.json
+"""
+import json
+import sys
+from argparse import ArgumentParser
+
+SUPPORTED_VERSIONS = {1}
+METRICS = ("wall", "cpu", "imports")
+
+
+def load_report(path):
+    with open(path, "r") as f:
+        report = json.load(f)
+    version = report.get("version")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"{path}: unsupported startup profile version {version}")
+    return report
+
+
+def compare_reports(base, new):
+    """Returns a list of (phase, metric, base, new) rows
+
+    Phases missing from one of the reports have a value of None.
+    """
+    base_phases = {phase["name"]: phase for phase in base["phases"]}
+    new_phases = {phase["name"]: phase for phase in new["phases"]}
+    names = list(base_phases)
+    names += [name for name in new_phases if name not in base_phases]
+    names.append("total")
+    base_phases["total"] = base["total"]
+    new_phases["total"] = new["total"]
+
+    rows = []
+    for name in names:
+        for metric in METRICS:
+            base_value = base_phases.get(name, {}).get(metric)
+            new_value = new_phases.get(name, {}).get(metric)
+            rows.append((name, metric, base_value, new_value))
+    return rows
+
+
+def format_value(metric, value):
+    if value is None:
+        return "-"
+    if metric == "imports":
+        return str(value)
+    return f"{value:.3f}s"
+
+
+def main():
+    ap = ArgumentParser(description="Compare startup profile reports")
+    ap.add_argument("base", help="baseline startup-profile.json")
+    ap.add_argument("new", help="new startup-profile.json")
+    ap.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative wall time increase to treat as a regression "
+        "(default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    base = load_report(args.base)
+    new = load_report(args.new)
+
+    regressions = []
+    print(f"{'phase':<24} {'metric':<8} {'base':>10} {'new':>10} {'change':>8}")
+    for name, metric, base_value, new_value in compare_reports(base, new):
+        change = ""
+        if base_value and new_value is not None:
+            ratio = (new_value - base_value) / base_value
+            change = f"{ratio:+.1%}"
+            if metric == "wall" and ratio > args.threshold:
+                regressions.append(name)
+        print(
+            f"{name:<24} {metric:<8} {format_value(metric, base_value):>10} "
+            f"{format_value(metric, new_value):>10} {change:>8}"
+        )
+
+    if regressions:
+        print(f"Wall time regressions: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Benchmark page load bytes and CPU time for static asset encodings
+
+The static asset requests of a page load recorded in a HAR file are
+sent to Kolibri's WSGI application in this process with a copy of the
+given KOLIBRI_HOME. Each request is made without compression, with the
+response compressed by the server for every request, and with the
+precompressed siblings added by compressstatic.py served as is. The
+total bytes and the mean CPU time per request are reported. Kolibri must
+be installed in the host Python environment. Run compressstatic.py on
+the installed packages to compare before and after.
+"""
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from shutil import copytree
+from urllib.parse import urlsplit
+
+from poolbench import load_har_paths
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src/main/python")
+)
+from kolibri_android.kolibri_extra.static_files import (  # noqa: E402
+    install_brotli_static_files,
+)
+
+MODES = (
+    # Name, Accept-Encoding, compress the response per request.
+    ("identity", "identity", False),
+    ("dynamic_gzip", "identity", True),
+    ("precompressed", "gzip, deflate", False),
+    ("precompressed_br", "gzip, deflate, br", False),
+)
+
+
+def request(application, path, accept_encoding, compress):
+    """Make a request returning the response size and CPU time"""
+    url = urlsplit(path)
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "SERVER_NAME": "127.0.0.1",
+        "SERVER_PORT": "8080",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_ACCEPT_ENCODING": accept_encoding,
+        "wsgi.url_scheme": "http",
+        "wsgi.input": sys.stdin.buffer,
+        "wsgi.errors": sys.stderr,
+    }
+    status = []
+
+    def start_response(response_status, headers, exc_info=None):
+        status.append(response_status)
+
+    start = time.process_time()
+    response = application(environ, start_response)
+    try:
+        body = b"".join(response)
+    finally:
+        if hasattr(response, "close"):
+            response.close()
+    if compress:
+        body = gzip.compress(body, compresslevel=6)
+    return len(body), time.process_time() - start, status[0]
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("home", help="KOLIBRI_HOME directory to copy")
+    ap.add_argument("har", help="HAR file of a recorded page load")
+    ap.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=5,
+        help="number of page loads per mode (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kolibri_home = os.path.join(tmpdir, "home")
+        copytree(args.home, kolibri_home)
+        os.environ["KOLIBRI_HOME"] = kolibri_home
+
+        from kolibri.utils.main import initialize
+
+        initialize()
+
+        from django.conf import settings
+        from kolibri.deployment.default.wsgi import application
+
+        # Serve the .br siblings like the app's server.
+        install_brotli_static_files()
+
+        paths = [
+            path
+            for path in load_har_paths(args.har)
+            if path.startswith(settings.STATIC_URL)
+        ]
+        print(f"Requesting {len(paths)} static assets", file=sys.stderr)
+
+        # Load the static file index so each mode measures the same thing.
+        for path in paths:
+            request(application, path, "identity", False)
+
+        print(f"{'mode':<16} {'bytes':>10} {'cpu/req':>9} {'errors':>7}")
+        for name, accept_encoding, compress in MODES:
+            sizes = []
+            times = []
+            errors = 0
+            for _ in range(args.runs):
+                for path in paths:
+                    size, cpu_time, status = request(
+                        application, path, accept_encoding, compress
+                    )
+                    sizes.append(size)
+                    times.append(cpu_time)
+                    if not status.startswith("200"):
+                        errors += 1
+            print(
+                f"{name:<16} {sum(sizes) // args.runs:>10} "
+                f"{statistics.mean(times) * 1000:>7.2f}ms {errors // args.runs:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
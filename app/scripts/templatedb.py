@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Create the pre-migrated template databases for the first launch
+
+Kolibri is initialized in a temporary KOLIBRI_HOME from the extracted
+python packages with the app's settings module and plugins, which runs
+every migration including those of the kolibri_android plugin. The
+resulting SQLite databases are cleaned of per device identifiers,
+compacted and written to the kolibri_android_template package in the
+output python source directory with Kolibri's plugin state and a stamp
+recording the APK and Kolibri versions. See kolibri_android/template_db.py
+for how they're used.
+
+The extracted packages were installed for the app's Python version, so
+the databases can only be migrated with the same Python version on the
+build host, and the host Python must be able to import Kolibri from them.
+If it can't, a warning is logged and the output directory is left empty.
+The app then migrates the databases from scratch on the first launch.
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+
+PYTHON_SRC_DIR = Path(__file__).absolute().parent.parent / "src/main/python"
+
+sys.path.insert(0, os.fspath(PYTHON_SRC_DIR))
+from kolibri_android.template_db import PLUGINS_FILENAME  # noqa: E402
+from kolibri_android.template_db import TEMPLATE_PACKAGE  # noqa: E402
+from kolibri_android.template_db import VERSION_FILENAME  # noqa: E402
+from kolibri_android.template_db import write_template_stamp  # noqa: E402
+
+logger = logging.getLogger("templatedb")
+
+# Imports checked with the host Python before migrating.
+CHECK_CODE = """
+import sqlite3
+
+import kolibri.utils.main
+"""
+
+CHILD_CODE = """
+from kolibri_android.plugin_config import update_plugins
+
+update_plugins()
+
+from kolibri.utils.main import initialize
+
+initialize()
+"""
+
+# Environment variables that would make the template specific to the
+# build host.
+UNSET_ENV = [
+    "KOLIBRI_AUTOMATIC_PROVISION_FILE",
+    "MORANGO_NODE_ID",
+]
+
+# Tables holding identifiers that have to be unique to each device. Morango
+# and Kolibri create new rows when they're missing.
+DEVICE_TABLES = [
+    "device_contentcachekey",
+    "morango_databaseidmodel",
+    "morango_instanceidmodel",
+]
+
+
+def get_env(kolibri_home, pythonpath):
+    env = os.environ.copy()
+    for name in UNSET_ENV:
+        env.pop(name, None)
+    env.update(
+        {
+            "KOLIBRI_HOME": kolibri_home,
+            "KOLIBRI_RUN_MODE": "template",
+            "DJANGO_SETTINGS_MODULE": "kolibri_android.kolibri_extra.settings",
+            "PYTHONPATH": os.pathsep.join(map(os.fspath, pythonpath)),
+        }
+    )
+    return env
+
+
+def check_host_python(python_version, kolibri_home, pythonpath):
+    """Check that the host Python can create the template
+
+    The host Python version has to match the app's so the databases are
+    migrated by the same code paths as on the device. Returns a message
+    explaining why it can't or None.
+    """
+    host_version = "{}.{}".format(*sys.version_info[:2])
+    if host_version != python_version:
+        return (
+            f"The template databases must be created with Python {python_version} "
+            f"like the app, but {sys.executable} is Python {host_version}"
+        )
+
+    proc = subprocess.run(
+        [sys.executable, "-c", CHECK_CODE],
+        env=get_env(kolibri_home, pythonpath),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    if proc.returncode != 0:
+        error = proc.stdout.strip().splitlines()[-1:] or ["unknown error"]
+        return (
+            f"{sys.executable} can't import Kolibri from the extracted packages, "
+            f"check that their compiled extensions support the host: {error[0]}"
+        )
+
+    return None
+
+
+def migrate(kolibri_home, pythonpath):
+    env = get_env(kolibri_home, pythonpath)
+    subprocess.run([sys.executable, "-c", CHILD_CODE], env=env, check=True)
+
+
+def get_tables(conn):
+    return {
+        name
+        for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+
+
+def clean_database(src_path, dest_path):
+    """Copy a database without device identifiers
+
+    Returns the applied migrations.
+    """
+    conn = sqlite3.connect(src_path, isolation_level=None)
+    try:
+        tables = get_tables(conn)
+        migrations = []
+        if "django_migrations" in tables:
+            migrations = [
+                f"{app}.{name}"
+                for app, name in conn.execute("SELECT app, name FROM django_migrations")
+            ]
+        for table in DEVICE_TABLES:
+            if table in tables:
+                conn.execute(f'DELETE FROM "{table}"')
+        # Write a compacted copy in rollback journal mode so the template
+        # is a single file. Kolibri switches it back to WAL when it opens it.
+        conn.execute("VACUUM INTO ?", (os.fspath(dest_path),))
+    finally:
+        conn.close()
+
+    conn = sqlite3.connect(dest_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+
+    return migrations
+
+
+def create_template(pkgroot, output, version_name, version_code, python_version):
+    """Create the template package in the output directory
+
+    Returns whether the template was created.
+    """
+    shutil.rmtree(output, ignore_errors=True)
+    output.mkdir(parents=True)
+
+    pythonpath = [pkgroot / "common", PYTHON_SRC_DIR]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        kolibri_home = Path(tmpdir) / "home"
+        error = check_host_python(python_version, os.fspath(kolibri_home), pythonpath)
+        if error is not None:
+            logger.warning(f"Not creating template databases: {error}")
+            return False
+
+        template_dir = output / TEMPLATE_PACKAGE
+        template_dir.mkdir()
+
+        logger.info(f"Migrating databases in {kolibri_home}")
+        migrate(os.fspath(kolibri_home), pythonpath)
+
+        migrations = {}
+        for db_path in sorted(kolibri_home.glob("*.sqlite3")):
+            dest_path = template_dir / db_path.name
+            migrations[db_path.name] = clean_database(db_path, dest_path)
+            logger.info(
+                f"Wrote {dest_path} with {len(migrations[db_path.name])} "
+                f"migrations ({dest_path.stat().st_size} bytes)"
+            )
+
+        shutil.copyfile(
+            kolibri_home / PLUGINS_FILENAME, template_dir / PLUGINS_FILENAME
+        )
+        kolibri_version = (kolibri_home / VERSION_FILENAME).read_text().strip()
+
+    # The template is shipped as a package so it's extracted to the
+    # filesystem and can be found with importlib.
+    (template_dir / "__init__.py").touch()
+    write_template_stamp(
+        template_dir, version_name, version_code, kolibri_version, migrations
+    )
+    return True
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        "-p",
+        "--pkgroot",
+        default=Path("."),
+        type=Path,
+        help="package root directory",
+    )
+    ap.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        type=Path,
+        help=f"python source directory to write the {TEMPLATE_PACKAGE} package in",
+    )
+    ap.add_argument(
+        "--version-file",
+        required=True,
+        type=Path,
+        help="JSON version file written by versions.py",
+    )
+    ap.add_argument(
+        "--python-version",
+        required=True,
+        help="the app's Python version, e.g. 3.9",
+    )
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with args.version_file.open("r") as f:
+        version_data = json.load(f)
+
+    create_template(
+        args.pkgroot.resolve(),
+        args.output.resolve(),
+        version_data["versionName"],
+        version_data.get("versionCode", 0),
+        args.python_version,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Benchmark serving zip content with and without the archive cache
+
+Members of an HTML5 app archive are requested from several threads
+through Kolibri's get_embedded_file and through the cached version used
+by the app's zip content server. Responses are consumed the way the WSGI
+server would, using the app's wsgi.file_wrapper for the cached version.
+Requests per second and the process RSS after each run are reported.
+Without an archive, a synthetic one with stored and deflated members is
+generated. Kolibri must be installed in the host Python environment.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from argparse import ArgumentParser
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src/main/python")
+)
+from kolibri_android.memory import get_rss  # noqa: E402
+
+
+def create_archive(path, members, size):
+    """Create an archive of alternating stored and deflated members"""
+    rng = random.Random(0)
+    words = [b"kolibri", b"content", b"function", b"var", b"return", b"{", b"}"]
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("index.html", b"<html><body>Hello</body></html>")
+        for i in range(members):
+            if i % 2:
+                name = f"assets/script{i}.js"
+                data = b" ".join(rng.choice(words) for _ in range(size // 6))
+                compress_type = zipfile.ZIP_DEFLATED
+            else:
+                name = f"assets/image{i}.png"
+                data = rng.randbytes(size)
+                compress_type = zipfile.ZIP_STORED
+            zf.writestr(name, data[:size], compress_type=compress_type)
+
+
+def consume(response, file_wrapper):
+    """Iterate over a response like Kolibri's zip content view"""
+    from django.http.response import FileResponse
+
+    total = 0
+    if file_wrapper is not None and isinstance(response, FileResponse):
+        content = file_wrapper(response.file_to_stream)
+    else:
+        content = response
+    for chunk in content:
+        total += len(chunk)
+    response.close()
+    return total
+
+
+def benchmark(get_embedded_file, file_wrapper, path, names, requests, threads):
+    filename = os.path.basename(path)
+    per_thread = requests // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            response = get_embedded_file(path, filename, rng.choice(names))
+            consume(response, file_wrapper)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("archive", nargs="?", help="zip archive to serve")
+    ap.add_argument(
+        "-n",
+        "--requests",
+        type=int,
+        default=5000,
+        help="number of requests per run (default: %(default)s)",
+    )
+    ap.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=10,
+        help="number of requesting threads (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--members",
+        type=int,
+        default=500,
+        help="members in the generated archive (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--member-size",
+        type=int,
+        default=32 << 10,
+        help="size of the generated members (default: %(default)s)",
+    )
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ["KOLIBRI_HOME"] = os.path.join(tmpdir, "home")
+        from kolibri.utils.env import set_env
+
+        set_env()
+
+        import django
+
+        django.setup()
+
+        from kolibri.core.content import zip_wsgi
+        from kolibri_android.kolibri_extra import zip_content
+
+        path = args.archive
+        if path is None:
+            path = os.path.join(tmpdir, "bundle.zip")
+            create_archive(path, args.members, args.member_size)
+        with zipfile.ZipFile(path) as zf:
+            names = [info.filename for info in zf.infolist() if not info.is_dir()]
+
+        kolibri_get_embedded_file = zip_wsgi.get_embedded_file
+        zip_content.install_zip_content_cache()
+
+        runs = (
+            ("kolibri", kolibri_get_embedded_file, None),
+            ("cached", zip_content.get_embedded_file, zip_content.FileWrapper),
+        )
+        print(f"{'':<10} {'req/s':>9} {'RSS':>9}")
+        for name, get_embedded_file, file_wrapper in runs:
+            rate = benchmark(
+                get_embedded_file,
+                file_wrapper,
+                path,
+                names,
+                args.requests,
+                args.threads,
+            )
+            print(f"{name:<10} {rate:>9.1f} {get_rss() / (1 << 20):>7.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
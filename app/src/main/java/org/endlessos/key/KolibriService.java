@@ -12,6 +12,7 @@ import android.os.RemoteException;
 
 import androidx.annotation.Nullable;
 
+import com.chaquo.python.Kwarg;
 import com.chaquo.python.PyObject;
 import com.chaquo.python.Python;
 
@@ -21,9 +22,15 @@ public class KolibriService extends Service {
     // Message IDs.
     static final int MSG_GET_SERVER_DATA = 1;
 
+    // Seconds to wait before starting the ZeroConf broadcast. 0 starts it with the server.
+    private static final String ZEROCONF_DELAY_SYSPROP = "debug.org.endlessos.key.zeroconf_delay";
+
     // Singleton instance.
     private static KolibriService instance;
-    private PyObject serverBus;
+
+    // The server bus is kept for the life of the process. When the service is destroyed, the bus
+    // is suspended so that a new service instance can resume it without reloading Kolibri.
+    private static PyObject serverBus;
     private String serverUrl;
     private String appKey;
 
@@ -46,10 +53,19 @@ public class KolibriService extends Service {
         if (serverBus == null) {
             final Python python = Python.getInstance();
             final PyObject serverModule = python.getModule("kolibri_android.server");
-            serverBus = serverModule.callAttr("ServerProcessBus");
+            final int zeroconfDelay = KolibriUtils.getSysPropInt(ZEROCONF_DELAY_SYSPROP, -1);
+            if (zeroconfDelay >= 0) {
+                serverBus =
+                        serverModule.callAttr(
+                                "ServerProcessBus", new Kwarg("zeroconf_delay", zeroconfDelay));
+            } else {
+                serverBus = serverModule.callAttr("ServerProcessBus");
+            }
+            Logger.i("Starting Kolibri server");
+        } else {
+            Logger.i("Resuming Kolibri server");
         }
 
-        Logger.i("Starting Kolibri server");
         serverBus.callAttr("start");
         serverUrl = serverBus.callAttr("get_url").toString();
         appKey = serverBus.callAttr("get_app_key").toString();
@@ -58,14 +74,23 @@ public class KolibriService extends Service {
 
     @Override
     public void onDestroy() {
-        Logger.i("Stopping Kolibri server");
-        serverBus.callAttr("stop");
-        Logger.d("Server stopped");
+        Logger.i("Suspending Kolibri server");
+        serverBus.callAttr("suspend");
+        Logger.d("Server suspended");
         serverUrl = null;
         appKey = null;
         instance = null;
     }
 
+    @Override
+    public void onTrimMemory(int level) {
+        super.onTrimMemory(level);
+        if (serverBus != null) {
+            Logger.d("Trimming memory for level " + level);
+            serverBus.callAttr("trim_memory", level);
+        }
+    }
+
     /**
      * Returns the current KolibriService instance.
      *
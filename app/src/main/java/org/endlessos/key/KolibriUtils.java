@@ -1,6 +1,7 @@
 package org.endlessos.key;
 
 import android.annotation.SuppressLint;
+import android.app.ActivityManager;
 import android.content.Context;
 import android.content.pm.ApplicationInfo;
 import android.content.pm.PackageInfo;
@@ -33,6 +34,16 @@ import java.util.TimeZone;
 
 /** Kolibri utility functions. */
 public class KolibriUtils {
+    private static final String PROFILE_STARTUP_SYSPROP =
+            "debug.org.endlessos.key.profile_startup";
+    private static final String THREAD_POOL_SYSPROP = "debug.org.endlessos.key.thread_pool";
+    private static final String REQUEST_METRICS_SYSPROP =
+            "debug.org.endlessos.key.request_metrics";
+    private static final String STRUCTURED_LOGGING_SYSPROP =
+            "debug.org.endlessos.key.structured_logging";
+    private static final String SESSION_ENGINE_SYSPROP = "debug.org.endlessos.key.session_engine";
+    private static final String SQLITE_PROFILE_SYSPROP = "debug.org.endlessos.key.sqlite_profile";
+
     private static boolean kolibriInitialized = false;
 
     /**
@@ -77,18 +88,37 @@ public class KolibriUtils {
             final String kolibriHome = getKolibriHome(context).toString();
             Logger.i("Initializing Kolibri in " + kolibriHome);
 
+            final ActivityManager activityManager =
+                    context.getSystemService(ActivityManager.class);
+
             final Python python = Python.getInstance();
             final PyObject utilsModule = python.getModule("kolibri_android.kolibri_utils");
             final Object[] kwargs = {
                 new Kwarg("kolibri_home", kolibriHome),
                 new Kwarg("kolibri_run_mode", getKolibriRunMode(context)),
                 new Kwarg("version_name", BuildConfig.VERSION_NAME),
+                new Kwarg("version_code", BuildConfig.VERSION_CODE),
                 new Kwarg("timezone", TimeZone.getDefault().getDisplayName()),
                 new Kwarg(
                         "node_id",
                         Secure.getString(context.getContentResolver(), Secure.ANDROID_ID)),
                 // For now, always run in debug mode.
-                new Kwarg("debug", true)
+                new Kwarg("debug", true),
+                // Write log records from a background thread.
+                new Kwarg("queued_logging", true),
+                new Kwarg(
+                        "structured_logging",
+                        getSysPropBoolean(STRUCTURED_LOGGING_SYSPROP, false)),
+                new Kwarg("profile_startup", getSysPropBoolean(PROFILE_STARTUP_SYSPROP, false)),
+                // Device capabilities used to size the server thread pool.
+                new Kwarg("cpu_count", Runtime.getRuntime().availableProcessors()),
+                new Kwarg("memory_class", activityManager.getMemoryClass()),
+                new Kwarg("low_ram_device", activityManager.isLowRamDevice()),
+                new Kwarg("cherrypy_thread_pool", getSysPropInt(THREAD_POOL_SYSPROP, 0)),
+                new Kwarg("session_engine", getSysPropString(SESSION_ENGINE_SYSPROP, "")),
+                new Kwarg("sqlite_profile", getSysPropString(SQLITE_PROFILE_SYSPROP, "")),
+                new Kwarg(
+                        "request_metrics", getSysPropBoolean(REQUEST_METRICS_SYSPROP, false))
             };
             utilsModule.callAttr("initialize", kwargs);
             kolibriInitialized = true;
@@ -264,4 +294,60 @@ public class KolibriUtils {
             return defaultValue;
         }
     }
+
+    @SuppressLint("PrivateApi")
+    public static String getSysPropString(String key, String defaultValue) {
+        // The SystemProperties class is not exported in the SDK, so we need to resolve the class at
+        // runtime.
+        final Class<?> SystemProperties;
+        try {
+            SystemProperties = Class.forName("android.os.SystemProperties");
+        } catch (ClassNotFoundException e) {
+            Logger.e("Could not load android.os.SystemProperties class", e);
+            return defaultValue;
+        }
+
+        final Method get;
+        try {
+            get = SystemProperties.getMethod("get", String.class, String.class);
+        } catch (Exception e) {
+            Logger.e("Failed to find get method from android.os.SystemProperties class", e);
+            return defaultValue;
+        }
+
+        try {
+            return (String) get.invoke(null, key, defaultValue);
+        } catch (Exception e) {
+            Logger.e("Failed to invoke get from android.os.SystemProperties class", e);
+            return defaultValue;
+        }
+    }
+
+    @SuppressLint("PrivateApi")
+    public static int getSysPropInt(String key, int defaultValue) {
+        // The SystemProperties class is not exported in the SDK, so we need to resolve the class at
+        // runtime.
+        final Class<?> SystemProperties;
+        try {
+            SystemProperties = Class.forName("android.os.SystemProperties");
+        } catch (ClassNotFoundException e) {
+            Logger.e("Could not load android.os.SystemProperties class", e);
+            return defaultValue;
+        }
+
+        final Method getInt;
+        try {
+            getInt = SystemProperties.getMethod("getInt", String.class, int.class);
+        } catch (Exception e) {
+            Logger.e("Failed to find getInt method from android.os.SystemProperties class", e);
+            return defaultValue;
+        }
+
+        try {
+            return (Integer) getInt.invoke(null, key, defaultValue);
+        } catch (Exception e) {
+            Logger.e("Failed to invoke getInt from android.os.SystemProperties class", e);
+            return defaultValue;
+        }
+    }
 }
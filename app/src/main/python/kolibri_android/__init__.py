@@ -0,0 +1,7 @@
+from .host_java import get_java_backend
+from .host_java import HOST_JAVA_BACKEND
+from .host_java import install_host_java
+
+# The Java classes have to be in place before any module importing them.
+if get_java_backend() == HOST_JAVA_BACKEND:
+    install_host_java()
@@ -1,5 +1,14 @@
+import glob
+import gzip
 import logging
+import logging.handlers
 import os
+import queue
+import re
+import shutil
+import threading
+import time
+import traceback
 
 from android.util import Log
 from java.lang import String
@@ -7,9 +16,30 @@ from org.endlessos.key import KolibriActivity
 from org.endlessos.key import KolibriFileProvider
 from org.endlessos.key import KolibriService
 
+from .logging_utils import STRUCTURED_LOGGING_ENV
+
 
 logger = logging.getLogger(__name__)
 
+# Setting this environment variable to 1 makes the logging configuration
+# write records from a background thread.
+QUEUED_LOGGING_ENV = "KOLIBRI_ANDROID_QUEUED_LOGGING"
+
+# Maximum number of records waiting to be written before new records are
+# dropped.
+LOG_QUEUE_SIZE = 10000
+
+# Maximum number of records written by the background thread at once.
+LOG_BATCH_SIZE = 200
+
+# Maximum number of characters joined into a single Android log message. The
+# logger payload limit is about 4 KiB of UTF-8, so this leaves room for
+# multibyte characters.
+LOGCAT_BATCH_CHARS = 1024
+
+# Name of the compressed log bundle created for support reports.
+LOG_BUNDLE_FILENAME = "kolibri-logs.txt.gz"
+
 
 def get_activity():
     """Get the KolibriActivity instance
@@ -63,17 +93,201 @@ def share_file(path, message, mimetype=None, app=None):
     )
 
 
-class AndroidLogHandler(logging.Handler):
+def queued_logging_enabled():
+    return os.environ.get(QUEUED_LOGGING_ENV) == "1"
+
+
+def structured_logging_enabled():
+    return os.environ.get(STRUCTURED_LOGGING_ENV) == "1"
+
+
+class LogQueue:
+    """Bounded queue of log records written by a background thread
+
+    Records are queued by QueuedHandlerMixin handlers and written in
+    batches by a single daemon thread so that logging threads don't wait
+    on the Android logger or the log file. When the queue is full, new
+    records are dropped and counted, and a warning with the number of
+    dropped records is written once there's room again.
+    """
+
+    def __init__(self, maxsize=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.queued = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, handler, record):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((handler, record))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+        else:
+            with self._lock:
+                self.queued += 1
+
+    def flush(self, timeout=None):
+        """Wait until all currently queued records have been written
+
+        Returns False if the records could not be written within the
+        timeout.
+        """
+        if self._thread is None:
+            return True
+        if threading.current_thread() is self._thread:
+            return False
+
+        done = threading.Event()
+        try:
+            self._queue.put((None, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "pending": self._queue.qsize(),
+            }
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="LogQueue", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(items)
+
+    def _write(self, items):
+        batches = {}
+        flushed = []
+        for handler, item in items:
+            if handler is None:
+                flushed.append(item)
+            else:
+                batches.setdefault(handler, []).append(item)
+
+        # The dropped records warning is added directly to the batches rather
+        # than logged since that could take the logging module lock, which
+        # is held while handlers are closed and flushing this queue.
+        with self._lock:
+            dropped = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        if dropped:
+            warning = logging.LogRecord(
+                __name__,
+                logging.WARNING,
+                __file__,
+                0,
+                f"Dropped {dropped} log records",
+                None,
+                None,
+            )
+            for records in batches.values():
+                records.append(warning)
+
+        for handler, records in batches.items():
+            handler.handle_batch(records)
+
+        for done in flushed:
+            done.set()
+
+
+_log_queue = LogQueue()
+
+
+def get_log_queue_stats():
+    """Return the queued and dropped record counts of the log queue"""
+    return _log_queue.get_stats()
+
+
+def flush_log_queue(timeout=5):
+    """Wait for queued log records to be written"""
+    if not _log_queue.flush(timeout):
+        logger.warning(f"Log queue not flushed within {timeout} seconds")
+
+
+class QueuedHandlerMixin:
+    """Mixin for handlers that can write records from the log queue
+
+    When queued is true, records passing the handler's filters are added
+    to the log queue and later written from its thread with
+    handle_batch. Subclasses can override emit_batch to write several
+    records more efficiently than emitting them individually.
+    """
+
+    def __init__(self, *args, queued=False, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.queued = queued
+
+    def handle(self, record):
+        if not self.queued:
+            return super().handle(record)
+
+        rv = self.filter(record)
+        if rv:
+            # Merge the message arguments now in case they're mutated before
+            # the record is written.
+            if record.args:
+                record.msg = record.getMessage()
+                record.args = None
+            _log_queue.put(self, record)
+        return rv
+
+    def handle_batch(self, records):
+        self.acquire()
+        try:
+            self.emit_batch(records)
+        finally:
+            self.release()
+
+    def emit_batch(self, records):
+        for record in records:
+            self.emit(record)
+
+    def close(self):
+        if self.queued:
+            # Don't wait long since this may be called with the logging
+            # module lock held.
+            _log_queue.flush(timeout=1)
+        super().close()
+
+
+class AndroidLogHandler(QueuedHandlerMixin, logging.Handler):
     """Logging handler dispatching to android.util.Log
 
     Converts Python logging records to Android log messages viewable
     with "adb logcat". The handler converts logging levels to log
     priorities, which allows filtering by priority with logcat or other
     Android log analysis tools.
+
+    When queued, consecutive records with the same priority are joined
+    into a single Android log message to reduce the number of calls
+    into Java.
     """
 
-    def __init__(self, tag):
-        super().__init__()
+    def __init__(self, tag, queued=False):
+        super().__init__(queued=queued)
 
         self.tag = tag
 
@@ -85,6 +299,33 @@ class AndroidLogHandler(logging.Handler):
         except:  # noqa: E722
             self.handleError(record)
 
+    def emit_batch(self, records):
+        pending = []
+        pending_priority = None
+        pending_chars = 0
+        for record in records:
+            try:
+                msg = self.format(record)
+                priority = self.level_to_priority(record.levelno)
+                if pending and (
+                    priority != pending_priority
+                    or pending_chars + len(msg) > LOGCAT_BATCH_CHARS
+                ):
+                    Log.println(pending_priority, self.tag, "\n".join(pending))
+                    pending = []
+                    pending_chars = 0
+                pending.append(msg)
+                pending_priority = priority
+                pending_chars += len(msg) + 1
+            except:  # noqa: E722
+                self.handleError(record)
+
+        if pending:
+            try:
+                Log.println(pending_priority, self.tag, "\n".join(pending))
+            except:  # noqa: E722
+                self.handleError(records[-1])
+
     @staticmethod
     def level_to_priority(level):
         if level >= logging.CRITICAL:
@@ -101,6 +342,193 @@ class AndroidLogHandler(logging.Handler):
             return Log.VERBOSE
 
 
+class LogCompressor:
+    """Background thread compressing and pruning rotated log files
+
+    Rotated files are gzip compressed next to the original and the
+    oldest compressed archives are deleted until their total size is
+    within the handler's maxTotalBytes.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, handler):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="LogCompressor", daemon=True
+                )
+                self._thread.start()
+        self._queue.put(handler)
+
+    def _run(self):
+        while True:
+            handler = self._queue.get()
+            try:
+                self.compress(handler.baseFilename)
+                self.prune(handler.baseFilename, handler.maxTotalBytes)
+            except Exception:
+                # Logging here could recurse into the file handler, so report
+                # the error on stderr like logging does.
+                traceback.print_exc()
+
+    @staticmethod
+    def compress(base_filename):
+        for path in get_log_archives(base_filename):
+            if path.endswith(".gz"):
+                continue
+            tmp_path = f"{path}.gz.tmp"
+            with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dest:
+                shutil.copyfileobj(src, dest)
+            os.replace(tmp_path, f"{path}.gz")
+            os.unlink(path)
+
+    @staticmethod
+    def prune(base_filename, max_total_bytes):
+        if max_total_bytes <= 0:
+            return
+        archives = get_log_archives(base_filename)
+        sizes = [os.path.getsize(path) for path in archives]
+        total = sum(sizes)
+        for path, size in zip(archives, sizes):
+            if total <= max_total_bytes:
+                break
+            os.unlink(path)
+            total -= size
+
+
+_log_compressor = LogCompressor()
+
+
+# Suffixes of rotated log files. RotatingFileHandler names them with the
+# rotation time and a counter if the time is taken, while the standard
+# handler numbers them with the highest number being the oldest.
+_TIMESTAMP_ARCHIVE_RE = re.compile(r"\.(\d{8}-\d{6})(?:-(\d+))?(?:\.gz)?")
+_NUMBERED_ARCHIVE_RE = re.compile(r"\.(\d+)(?:\.gz)?")
+
+
+def _get_log_archive_key(base_filename, path):
+    suffix = path[len(base_filename) :]
+    match = _TIMESTAMP_ARCHIVE_RE.fullmatch(suffix)
+    if match:
+        return (2, match.group(1), int(match.group(2) or 0), path)
+    match = _NUMBERED_ARCHIVE_RE.fullmatch(suffix)
+    if match:
+        return (1, "", -int(match.group(1)), path)
+    return (0, "", 0, path)
+
+
+def get_log_archives(base_filename):
+    """Rotated log files for a log file, oldest first
+
+    The files are ordered by their rotation time and counter rather than
+    by name, since the counter isn't zero padded. Numbered files from the
+    standard handler are older than any timestamped file, and unknown
+    files are taken as the oldest.
+    """
+    archives = glob.glob(f"{glob.escape(base_filename)}.*")
+    return sorted(
+        (path for path in archives if not path.endswith(".tmp")),
+        key=lambda path: _get_log_archive_key(base_filename, path),
+    )
+
+
+class RotatingFileHandler(QueuedHandlerMixin, logging.handlers.RotatingFileHandler):
+    """Size based rotating file handler with compressed archives
+
+    When the file reaches maxBytes, it's renamed with the rotation time
+    and a background thread compresses it. The oldest archives are then
+    deleted so the compressed archives use at most maxTotalBytes. Only
+    the rename happens on the logging thread.
+
+    When writing a batch, each record is formatted once and the stream
+    is flushed once at the end. The standard handler formats each record
+    a second time to decide if the file needs to be rotated.
+    """
+
+    def __init__(self, filename, maxBytes=0, maxTotalBytes=0, **kwargs):
+        super().__init__(filename, maxBytes=maxBytes, **kwargs)
+
+        self.maxTotalBytes = maxTotalBytes
+
+        # Compress anything left uncompressed by a previous process or the
+        # standard handler.
+        _log_compressor.submit(self)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        archive = f"{self.baseFilename}.{timestamp}"
+        suffix = 0
+        while os.path.exists(archive) or os.path.exists(f"{archive}.gz"):
+            suffix += 1
+            archive = f"{self.baseFilename}.{timestamp}-{suffix}"
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, archive)
+        _log_compressor.submit(self)
+
+        if not self.delay:
+            self.stream = self._open()
+
+    def emit_batch(self, records):
+        for record in records:
+            try:
+                msg = self.format(record) + self.terminator
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0 and self.stream.tell() + len(msg) >= self.maxBytes:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(msg)
+            except:  # noqa: E722
+                self.handleError(record)
+        self.flush()
+
+
+def create_log_bundle(log_root, path=None):
+    """Create a compressed bundle of all Kolibri logs
+
+    gzip streams can be concatenated, so the compressed archives are
+    copied as is, oldest first, followed by compressed copies of any
+    uncompressed files. Files are streamed in chunks so the logs are
+    never loaded into memory. Returns the bundle path.
+    """
+    if path is None:
+        path = os.path.join(log_root, LOG_BUNDLE_FILENAME)
+
+    base_filename = os.path.join(log_root, "kolibri.txt")
+    sources = get_log_archives(base_filename)
+    if os.path.exists(base_filename):
+        sources.append(base_filename)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as bundle:
+        for source in sources:
+            if os.path.abspath(source) == os.path.abspath(path):
+                continue
+            with open(source, "rb") as src:
+                if source.endswith(".gz"):
+                    shutil.copyfileobj(src, bundle)
+                else:
+                    with gzip.GzipFile(fileobj=bundle, mode="wb") as dest:
+                        shutil.copyfileobj(src, dest)
+    os.replace(tmp_path, path)
+    return path
+
+
+def share_logs(log_root, message):
+    """Share a compressed bundle of the Kolibri logs with another application"""
+    path = create_log_bundle(log_root)
+    share_file(path, message, mimetype="application/gzip")
+
+
 def get_logging_config(LOG_ROOT, debug=False, debug_database=False):
     """Logging configuration
 
@@ -112,20 +540,39 @@ def get_logging_config(LOG_ROOT, debug=False, debug_database=False):
     DEFAULT_LEVEL = "INFO" if not debug else "DEBUG"
     DATABASE_LEVEL = "INFO" if not debug_database else "DEBUG"
     DEFAULT_HANDLERS = ["android", "file"]
+    QUEUED = queued_logging_enabled()
+    FILE_FORMATTER = "json" if structured_logging_enabled() else "full"
 
     return {
         "version": 1,
         "disable_existing_loggers": False,
-        # No filters are used here, but kolibri adds some and expects
-        # the top level filters dict to exist.
-        "filters": {},
+        # kolibri adds some filters and expects the top level filters dict
+        # to exist.
+        "filters": {
+            # Each noisy logger gets its own rate limit.
+            "worker_rate_limit": {
+                "()": "kolibri_android.logging_utils.RateLimitFilter",
+                "rate": 10,
+                "burst": 50,
+            },
+            "database_rate_limit": {
+                "()": "kolibri_android.logging_utils.RateLimitFilter",
+                "rate": 50,
+                "burst": 200,
+            },
+        },
         "formatters": {
+            # These are equivalent to the "%(name)s: %(message)s" and
+            # "%(asctime)s %(levelname)-8s %(name)s: %(message)s" formats but
+            # cheaper to apply.
             "simple": {
-                "format": "%(name)s: %(message)s",
+                "()": "kolibri_android.logging_utils.SimpleFormatter",
             },
             "full": {
-                "format": "%(asctime)s %(levelname)-8s %(name)s: %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S",
+                "()": "kolibri_android.logging_utils.FullFormatter",
+            },
+            "json": {
+                "()": "kolibri_android.logging_utils.JSONFormatter",
             },
         },
         "handlers": {
@@ -135,19 +582,21 @@ def get_logging_config(LOG_ROOT, debug=False, debug_database=False):
                 # Since Android logging already has timestamps and priority levels, they
                 # aren't needed here.
                 "formatter": "simple",
+                "queued": QUEUED,
             },
             "file": {
                 # Kolibri uses a customized version of
                 # logging.handlers.TimedRotatingFileHandler. We don't
                 # want to use that here to avoid importing kolibri too
-                # early. IMO, the regular rotating handler based on size
-                # is better in the Android case so the total disk space
-                # used for logs is managed.
-                "class": "logging.handlers.RotatingFileHandler",
+                # early. IMO, a rotating handler based on size is better in
+                # the Android case so the total disk space used for logs is
+                # managed.
+                "class": "kolibri_android.android_utils.RotatingFileHandler",
                 "filename": os.path.join(LOG_ROOT, "kolibri.txt"),
                 "maxBytes": 5 << 20,  # 5 Mib
-                "backupCount": 5,
-                "formatter": "full",
+                "maxTotalBytes": 5 << 20,  # 5 MiB of compressed archives
+                "formatter": FILE_FORMATTER,
+                "queued": QUEUED,
             },
         },
         "loggers": {
@@ -173,6 +622,7 @@ def get_logging_config(LOG_ROOT, debug=False, debug_database=False):
             # targets, i.e. --debug-level=high
             "kolibri.core.tasks.worker": {
                 "level": "INFO",
+                "filters": ["worker_rate_limit"],
             },
             "django": {
                 # kolibri expects the handlers list to exist so it can
@@ -181,6 +631,7 @@ def get_logging_config(LOG_ROOT, debug=False, debug_database=False):
             },
             "django.db.backends": {
                 "level": DATABASE_LEVEL,
+                "filters": ["database_rate_limit"],
             },
             "django.request": {
                 # kolibri expects the handlers list to exist so it can
@@ -0,0 +1,61 @@
+"""Persistent bytecode cache for the extracted python packages
+
+Chaquopy loads most modules from bytecode precompiled into the APK. The
+Django migrations packages are extracted to the filesystem instead and
+prunepackages.py removes their compiled modules, so every migration
+module is compiled from source whenever Django loads the migration
+graph.
+
+Setting sys.pycache_prefix makes the import system read and write the
+bytecode of modules loaded from source files in a separate directory
+tree rather than __pycache__ directories next to the sources. The cache
+is kept in KOLIBRI_HOME in a directory named for the APK version, so the
+migrations are compiled once per install or upgrade and the caches of
+previous versions are removed. Modules loaded from the APK are
+unaffected. This module doesn't depend on Android.
+"""
+import hashlib
+import logging
+import os
+import sys
+from shutil import rmtree
+
+logger = logging.getLogger(__name__)
+
+BYTECODE_CACHE_DIRNAME = "pycache"
+
+
+def get_bytecode_cache_key(version_name: str, version_code: int) -> str:
+    key = f"{version_name}\0{version_code}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def enable_bytecode_cache(kolibri_home: str, version_name: str, version_code: int):
+    """Cache compiled source modules in KOLIBRI_HOME
+
+    Returns the cache directory or None if it couldn't be created.
+    """
+    cache_root = os.path.join(kolibri_home, BYTECODE_CACHE_DIRNAME)
+    cache_key = get_bytecode_cache_key(version_name, version_code)
+    cache_dir = os.path.join(cache_root, cache_key)
+
+    try:
+        for entry in os.scandir(cache_root):
+            if entry.name != cache_key:
+                logger.info(f"Removing stale bytecode cache {entry.path}")
+                rmtree(entry.path, ignore_errors=True)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        logger.exception(f"Failed to create bytecode cache {cache_dir}")
+        return None
+
+    logger.info(f"Using bytecode cache {cache_dir}")
+    sys.pycache_prefix = cache_dir
+    # The cache directory is writable even if writing bytecode next to the
+    # sources has been disabled.
+    sys.dont_write_bytecode = False
+    return cache_dir
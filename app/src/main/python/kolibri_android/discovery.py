@@ -0,0 +1,112 @@
+"""Deferred ZeroConf broadcasting
+
+Registering the Kolibri ZeroConf service opens multicast sockets, starts
+threads and probes the network, which is wasted work on the startup path
+and on devices that are offline. DeferredZeroConf starts the broadcast
+from a background thread once a network is available and tears it down
+again when the network goes away.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Seconds after the server starts before the broadcast may start, so it
+# doesn't compete with the first page loads.
+ZEROCONF_DELAY = 30
+
+# Seconds between checks for network availability.
+ZEROCONF_CHECK_INTERVAL = 30
+
+
+def has_network():
+    """Whether the device has a non-loopback IPv4 address"""
+    from zeroconf import get_all_addresses
+
+    return any(not address.startswith("127.") for address in get_all_addresses())
+
+
+class DeferredZeroConf:
+    """Run a ZeroConfPlugin outside of the bus states
+
+    The plugin isn't subscribed to the bus. After start(), a thread waits
+    delay seconds and then checks the network every interval seconds,
+    starting the broadcast when there's a network and stopping it, which
+    closes its sockets and thread, when there isn't. With a delay of 0,
+    the broadcast is started before start() returns like the plugin
+    would be when subscribed. start_broadcast() starts it immediately.
+    """
+
+    def __init__(self, plugin, delay=ZEROCONF_DELAY, interval=ZEROCONF_CHECK_INTERVAL):
+        self.plugin = plugin
+        self.delay = delay
+        self.interval = interval
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def broadcasting(self):
+        # Kolibri can also start the broadcast by publishing UPDATE_ZEROCONF,
+        # so check the plugin rather than tracking it here.
+        return self.plugin.broadcast is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.delay <= 0:
+                self.start_broadcast()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self._stop_event,),
+                name="DeferredZeroConf",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            self._stop_event.set()
+        # The thread may be waiting for the lock, so join it without holding
+        # it.
+        if thread is not None:
+            thread.join()
+        self.stop_broadcast()
+
+    def start_broadcast(self):
+        with self._lock:
+            if self.broadcasting:
+                return
+            logger.info("Starting ZeroConf broadcast")
+            self.plugin.START()
+            self.plugin.RUN()
+
+    def stop_broadcast(self):
+        with self._lock:
+            if not self.broadcasting:
+                return
+            logger.info("Stopping ZeroConf broadcast")
+            self.plugin.STOP()
+
+    def check(self):
+        online = has_network()
+        with self._lock:
+            if online and not self.broadcasting:
+                self.start_broadcast()
+            elif not online and self.broadcasting:
+                self.stop_broadcast()
+
+    def _run(self, stop_event):
+        if stop_event.wait(max(self.delay, 0)):
+            return
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Failed to update ZeroConf broadcast")
+            if stop_event.wait(self.interval):
+                return
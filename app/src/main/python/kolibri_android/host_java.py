@@ -0,0 +1,153 @@
+"""Host stand-ins for the Java classes used from Python
+
+On the device, Chaquopy provides the java module and imports Java
+classes such as android.util.Log and the app's org.endlessos.key classes
+as if they were Python modules. When the KOLIBRI_ANDROID_JAVA_BACKEND
+environment variable is set to "host", importing kolibri_android
+installs modules with pure Python versions of the classes that are used
+instead, so kolibri_utils.initialize and server.ServerProcessBus can run
+a real Kolibri on a Linux host for benchmarks. Android log messages are
+written to stderr in logcat's brief format and there's no activity or
+service, so get_context() raises RuntimeError as it would before the
+components are created.
+"""
+import logging
+import os
+import sys
+import threading
+import types
+
+logger = logging.getLogger(__name__)
+
+# Environment variable selecting the Java backend, either "chaquopy" or
+# "host".
+JAVA_BACKEND_ENV = "KOLIBRI_ANDROID_JAVA_BACKEND"
+CHAQUOPY_JAVA_BACKEND = "chaquopy"
+HOST_JAVA_BACKEND = "host"
+
+
+def get_java_backend():
+    return os.environ.get(JAVA_BACKEND_ENV) or CHAQUOPY_JAVA_BACKEND
+
+
+class Log:
+    """android.util.Log writing to stderr"""
+
+    VERBOSE = 2
+    DEBUG = 3
+    INFO = 4
+    WARN = 5
+    ERROR = 6
+    ASSERT = 7
+
+    PRIORITY_LETTERS = {
+        VERBOSE: "V",
+        DEBUG: "D",
+        INFO: "I",
+        WARN: "W",
+        ERROR: "E",
+        ASSERT: "A",
+    }
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def println(cls, priority, tag, msg):
+        letter = cls.PRIORITY_LETTERS.get(priority, "?")
+        lines = "".join(f"{letter}/{tag}: {line}\n" for line in msg.splitlines())
+        with cls._lock:
+            sys.stderr.write(lines)
+            sys.stderr.flush()
+        return len(lines)
+
+
+class StatFs:
+    """android.os.StatFs using os.statvfs"""
+
+    def __init__(self, path):
+        self._stat = os.statvfs(path)
+
+    def getBlockSizeLong(self):
+        return self._stat.f_frsize
+
+    def getBlockCountLong(self):
+        return self._stat.f_blocks
+
+    def getFreeBlocksLong(self):
+        return self._stat.f_bfree
+
+    def getAvailableBlocksLong(self):
+        return self._stat.f_bavail
+
+
+class KolibriActivity:
+    """org.endlessos.key.KolibriActivity without an activity"""
+
+    @staticmethod
+    def getInstance():
+        return None
+
+
+class KolibriService:
+    """org.endlessos.key.KolibriService without a service"""
+
+    @staticmethod
+    def getInstance():
+        return None
+
+
+class KolibriFileProvider:
+    """org.endlessos.key.KolibriFileProvider logging shared files"""
+
+    @staticmethod
+    def shareFile(context, path, message, mimetype, app):
+        logger.info(f"Sharing {path} ({mimetype}) with {app or 'any app'}")
+
+
+# Java classes by package. java.lang.String is only used to pass Python
+# strings to Java.
+JAVA_CLASSES = {
+    "android.os": {"StatFs": StatFs},
+    "android.util": {"Log": Log},
+    "java.lang": {"String": str},
+    "org.endlessos.key": {
+        "KolibriActivity": KolibriActivity,
+        "KolibriFileProvider": KolibriFileProvider,
+        "KolibriService": KolibriService,
+    },
+}
+
+
+def jclass(name):
+    """Chaquopy's java.jclass for the host classes
+
+    Raises ImportError for classes that have no host version.
+    """
+    package, _, class_name = name.rpartition(".")
+    try:
+        return JAVA_CLASSES[package][class_name]
+    except KeyError:
+        raise ImportError(f"No host version of Java class {name}") from None
+
+
+def _get_module(name):
+    module = sys.modules.get(name)
+    if module is None:
+        module = types.ModuleType(name)
+        module.__path__ = []
+        sys.modules[name] = module
+
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(_get_module(parent), child, module)
+    return module
+
+
+def install_host_java():
+    """Install the host Java modules in sys.modules"""
+    logger.info("Using host Java classes")
+    for package, classes in JAVA_CLASSES.items():
+        module = _get_module(package)
+        for class_name, cls in classes.items():
+            setattr(module, class_name, cls)
+    _get_module("java").jclass = jclass
@@ -0,0 +1,199 @@
+"""Per-request metrics for the embedded server
+
+When the KOLIBRI_ANDROID_REQUEST_METRICS environment variable is set, the
+settings module installs RequestMetricsMiddleware, which records the
+latency, database queries and response size of each request in a fixed
+size in-memory ring. The ring is summarized per route and written to the
+log directory when the server bus stops. When the variable isn't set the
+middleware isn't installed at all.
+"""
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from datetime import timezone
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+REQUEST_METRICS_FILENAME = "request-metrics.json"
+
+# Number of most recent requests kept in the ring.
+REQUEST_METRICS_SIZE = 2000
+
+# Upper bounds in milliseconds of the latency histogram buckets. The last
+# bucket counts everything slower.
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class RequestMetrics:
+    """Fixed size ring of request samples
+
+    Each sample is a tuple of (route, status, latency, queries,
+    query_time, size) with times in seconds. Once the ring is full the
+    oldest samples are discarded.
+    """
+
+    def __init__(self, size=REQUEST_METRICS_SIZE):
+        self.total = 0
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, route, status, latency, queries, query_time, size):
+        with self._lock:
+            self._samples.append((route, status, latency, queries, query_time, size))
+            self.total += 1
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self.total = 0
+
+    def summarize(self):
+        """Aggregate the samples in the ring per route"""
+        with self._lock:
+            samples = list(self._samples)
+            total = self.total
+
+        by_route = {}
+        for sample in samples:
+            by_route.setdefault(sample[0], []).append(sample)
+
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "requests": total,
+            "sampled": len(samples),
+            "routes": {
+                route: _summarize_route(route_samples)
+                for route, route_samples in sorted(by_route.items())
+            },
+        }
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+def _summarize_route(samples):
+    latencies = sorted(sample[2] for sample in samples)
+    histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    for latency in latencies:
+        latency_ms = latency * 1000
+        index = next(
+            (i for i, bound in enumerate(LATENCY_BUCKETS) if latency_ms <= bound),
+            len(LATENCY_BUCKETS),
+        )
+        histogram[index] += 1
+
+    queries = [sample[3] for sample in samples]
+    sizes = [sample[5] for sample in samples if sample[5] is not None]
+    return {
+        "count": len(samples),
+        "errors": sum(1 for sample in samples if sample[1] >= 500),
+        "latency": {
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": latencies[-1],
+            "histogram": histogram,
+        },
+        "queries": {
+            "mean": statistics.mean(queries),
+            "max": max(queries),
+            "time": sum(sample[4] for sample in samples),
+        },
+        "bytes": sum(sizes),
+    }
+
+
+# Process wide request metrics.
+request_metrics = RequestMetrics()
+
+
+def write_request_metrics(log_root):
+    """Write the request metrics summary to the log directory
+
+    The slowest routes are also logged. Returns the path to the report
+    or None if no requests were recorded.
+    """
+    summary = request_metrics.summarize()
+    if not summary["sampled"]:
+        return None
+
+    path = os.path.join(log_root, REQUEST_METRICS_FILENAME)
+    with open(path, "w") as f:
+        json.dump({"buckets": LATENCY_BUCKETS, **summary}, f, indent=2)
+    logger.info(f"Wrote metrics for {summary['requests']} requests to {path}")
+
+    slowest = sorted(
+        summary["routes"].items(),
+        key=lambda item: item[1]["latency"]["p95"],
+        reverse=True,
+    )
+    for route, stats in slowest[:10]:
+        logger.info(
+            f"{route}: {stats['count']} requests, "
+            f"p50 {stats['latency']['p50'] * 1000:.1f}ms, "
+            f"p95 {stats['latency']['p95'] * 1000:.1f}ms, "
+            f"{stats['queries']['mean']:.1f} queries"
+        )
+    return path
+
+
+class RequestMetricsMiddleware:
+    """Record the latency, queries and response size of each request
+
+    Queries are counted with Django's debug cursor, which records each
+    query and its duration in the connection's queries_log. It's only
+    forced on for the connections of the thread handling the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        conns = connections.all()
+        debug_cursors = [conn.force_debug_cursor for conn in conns]
+        for conn in conns:
+            conn.force_debug_cursor = True
+            conn.queries_log.clear()
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            latency = time.perf_counter() - start
+            queries = [query for conn in conns for query in conn.queries_log]
+            for conn, debug_cursor in zip(conns, debug_cursors):
+                conn.force_debug_cursor = debug_cursor
+                conn.queries_log.clear()
+
+        request_metrics.record(
+            _get_route(request),
+            response.status_code,
+            latency,
+            len(queries),
+            sum(float(query["time"]) for query in queries),
+            _get_response_size(response),
+        )
+        return response
+
+
+def _get_route(request):
+    # Use the view name rather than the path so the number of routes stays
+    # bounded.
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name
+
+
+def _get_response_size(response):
+    if response.streaming:
+        length = response.get("Content-Length")
+        return int(length) if length else None
+    return len(response.content)
@@ -1,5 +1,14 @@
+import copy
+import hashlib
+import os
+import re
+import threading
+
 from django.conf import settings
 from django.contrib.auth import login
+from django.db.models.signals import post_delete
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
 from kolibri.core.auth.models import Facility
 from kolibri.core.auth.models import FacilityUser
 from kolibri.core.device.models import DevicePermissions
@@ -11,23 +20,102 @@ except ImportError:
 
 
 class AlwaysAuthenticatedMiddleware(MiddlewareMixin):
+    """Log unauthenticated requests in as the device user
+
+    The user and its device permissions are provisioned the first time
+    they're needed in the process and the user is cached, so later
+    unauthenticated requests are logged in without looking it up. The
+    cache is cleared when the user is deleted so it's provisioned again.
+    """
+
     def __init__(self, *args, **kwargs):
         self.username = "endless"
+        self._user = None
+        self._user_lock = threading.Lock()
+        post_delete.connect(self._user_deleted, sender=FacilityUser)
         super(AlwaysAuthenticatedMiddleware, self).__init__(*args, **kwargs)
 
     def process_request(self, request):
         if not request.user.is_authenticated():
-            facility = Facility.get_default_facility()
-            user, created = FacilityUser.objects.get_or_create(
-                username=self.username, facility=facility
-            )
-            DevicePermissions.objects.update_or_create(
-                user=user,
-                defaults={
-                    "is_superuser": False,
-                    "can_manage_content": True,
-                },
-            )
-
+            user = self._get_user()
             user.backend = settings.AUTHENTICATION_BACKENDS[0]
             login(request, user)
+
+    def _get_user(self):
+        user = self._user
+        if user is None:
+            with self._user_lock:
+                if self._user is None:
+                    self._user = self._provision_user()
+                user = self._user
+
+        # login() updates the user's last_login, so each request gets its own
+        # copy of the cached user.
+        return copy.copy(user)
+
+    def _user_deleted(self, sender, instance, **kwargs):
+        user = self._user
+        if user is not None and instance.pk == user.pk:
+            self._user = None
+
+    def _provision_user(self):
+        facility = Facility.get_default_facility()
+        user, created = FacilityUser.objects.get_or_create(
+            username=self.username, facility=facility
+        )
+        DevicePermissions.objects.update_or_create(
+            user=user,
+            defaults={
+                "is_superuser": False,
+                "can_manage_content": True,
+            },
+        )
+        return user
+
+
+class BundledAppCacheMiddleware(MiddlewareMixin):
+    """Make the bundled explore apps cacheable until the APK changes
+
+    The apps bundle is extracted from the APK into a read only directory,
+    so its files only change when the app is upgraded. Responses for the
+    explore plugin's app routes get a strong ETag derived from the
+    KOLIBRI_ANDROID_BUNDLE_VERSION environment variable and immutable
+    cache headers. Revalidation requests with a matching If-None-Match
+    get a 304 before the session is loaded or the archive is opened.
+    """
+
+    # Explore plugin app routes, with or without a language prefix.
+    path_re = re.compile(r"^/(?:[\w-]+/)?explore/app/")
+
+    cache_control = "public, max-age=31536000, immutable"
+
+    def __init__(self, *args, **kwargs):
+        version = os.environ["KOLIBRI_ANDROID_BUNDLE_VERSION"]
+        digest = hashlib.sha1(version.encode("utf-8")).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        super(BundledAppCacheMiddleware, self).__init__(*args, **kwargs)
+
+    def process_request(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if not self.path_re.match(request.path_info):
+            return None
+
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match and self.etag in parse_etags(if_none_match):
+            return self._add_headers(HttpResponseNotModified())
+        return None
+
+    def process_response(self, request, response):
+        if (
+            request.method in ("GET", "HEAD")
+            and response.status_code == 200
+            and self.path_re.match(request.path_info)
+        ):
+            self._add_headers(response)
+        return response
+
+    def _add_headers(self, response):
+        response["ETag"] = self.etag
+        response["Cache-Control"] = self.cache_control
+        return response
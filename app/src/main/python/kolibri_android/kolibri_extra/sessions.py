@@ -0,0 +1,111 @@
+"""Write-behind cached session backend
+
+Sessions are read from and written to an in-process cache. Changes are
+persisted to the database by a background thread rather than during the
+request, so the session row in db.sqlite3 isn't read or written on every
+request. Session creation and deletion are still written synchronously.
+Unpersisted changes are lost if the process is killed before a flush,
+which is acceptable since AlwaysAuthenticatedMiddleware logs the user in
+again.
+"""
+import logging
+import threading
+import time
+
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Seconds between persisting changed sessions to the database.
+WRITE_BEHIND_INTERVAL = 10
+
+
+class SessionWriter:
+    """Background thread persisting changed sessions to the database"""
+
+    def __init__(self, interval=WRITE_BEHIND_INTERVAL):
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, session_key, session_data, expire_date):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="SessionWriter", daemon=True
+                )
+                self._thread.start()
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def flush(self):
+        """Persist all pending sessions in the calling thread"""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        if not pending:
+            return
+
+        logger.debug(f"Writing {len(pending)} sessions to the database")
+        model = DBStore.get_model_class()
+        for session_key, (session_data, expire_date) in pending.items():
+            try:
+                self._write(model, session_key, session_data, expire_date)
+            except Exception:
+                logger.exception(f"Failed to write session {session_key}")
+
+    @staticmethod
+    def _write(model, session_key, session_data, expire_date):
+        updated = model.objects.filter(session_key=session_key).update(
+            session_data=session_data, expire_date=expire_date
+        )
+        if not updated:
+            # The row was removed, for example by clearsessions, so create it
+            # again rather than losing the changes.
+            logger.debug(f"Recreating session {session_key}")
+            store = DBStore(session_key)
+            store._session_cache = store.decode(session_data)
+            store.save(must_create=True)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+writer = SessionWriter()
+
+
+def flush_sessions():
+    """Persist pending session changes to the database"""
+    try:
+        writer.flush()
+    finally:
+        close_old_connections()
+
+
+class SessionStore(CachedDBStore):
+    def save(self, must_create=False):
+        # New sessions need the database to guarantee a unique key.
+        if must_create or self.session_key is None:
+            return super().save(must_create=must_create)
+
+        data = self._get_session()
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        writer.schedule(self.session_key, self.encode(data), self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is not None:
+            writer.discard(session_key)
+        super().delete(session_key)
@@ -2,12 +2,59 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import logging
+import os
+
 from kolibri.deployment.default.settings.base import *  # noqa E402
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_COOKIE_AGE = 52560000
 
+# Optional session storage modes, selected with the
+# KOLIBRI_ANDROID_SESSION_ENGINE environment variable. Since there's only one
+# user on the device, the session doesn't need to be read from the database
+# for every request.
+#
+# signed_cookies: The session is stored in a signed cookie.
+# cache: The session is kept in memory and written to the database in the
+#   background.
+#
+# Unknown modes are ignored like unknown SQLite profiles so that a mistyped
+# debug system property doesn't stop the app from starting.
+session_engine_mode = os.environ.get("KOLIBRI_ANDROID_SESSION_ENGINE", "")
+if session_engine_mode == "signed_cookies":
+    SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+elif session_engine_mode == "cache":
+    SESSION_ENGINE = "kolibri_android.kolibri_extra.sessions"
+    SESSION_CACHE_ALIAS = "android_sessions"
+    CACHES = dict(CACHES)  # noqa F405
+    CACHES[SESSION_CACHE_ALIAS] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "android_sessions",
+        "TIMEOUT": SESSION_COOKIE_AGE,
+    }
+elif session_engine_mode:
+    logging.getLogger(__name__).warning(
+        f"Unknown session engine mode {session_engine_mode}, using the default"
+    )
+
 
 MIDDLEWARE = list(MIDDLEWARE) + [  # noqa F405
     "kolibri_android.kolibri_extra.middleware.AlwaysAuthenticatedMiddleware"
 ]
+
+# Cache headers for the bundled explore apps, which change only with the APK
+# version in KOLIBRI_ANDROID_BUNDLE_VERSION. The middleware goes first so
+# revalidation requests are answered before the session is loaded.
+if os.environ.get("KOLIBRI_ANDROID_BUNDLE_VERSION"):
+    MIDDLEWARE.insert(
+        0, "kolibri_android.kolibri_extra.middleware.BundledAppCacheMiddleware"
+    )
+
+# Optional per-request metrics, enabled with the
+# KOLIBRI_ANDROID_REQUEST_METRICS environment variable. The middleware goes
+# first so its timing covers the rest of the middleware.
+if os.environ.get("KOLIBRI_ANDROID_REQUEST_METRICS"):
+    MIDDLEWARE.insert(
+        0, "kolibri_android.kolibri_extra.metrics.RequestMetricsMiddleware"
+    )
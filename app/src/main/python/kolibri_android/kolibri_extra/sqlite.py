@@ -0,0 +1,128 @@
+"""SQLite tuning profiles for the on-device databases
+
+The profile is chosen from the device memory during initialization and
+stored in the KOLIBRI_ANDROID_SQLITE_PROFILE environment variable. Its
+pragmas are applied to every new SQLite connection. This module doesn't
+import Django so the profiles can be used by host benchmarks.
+"""
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PROFILE_ENV = "KOLIBRI_ANDROID_SQLITE_PROFILE"
+
+# Pragmas applied to each connection, in order. Negative cache_size values
+# are in KiB. WAL with synchronous=NORMAL avoids an fsync per transaction on
+# flash storage while keeping the database consistent after a crash.
+SQLITE_PROFILES = {
+    "low": [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", 5000),
+        ("cache_size", -2000),
+        ("mmap_size", 0),
+    ],
+    "medium": [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", 5000),
+        ("cache_size", -8000),
+        ("mmap_size", 64 << 20),
+        ("temp_store", "MEMORY"),
+    ],
+    "high": [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", 5000),
+        ("cache_size", -32000),
+        ("mmap_size", 256 << 20),
+        ("temp_store", "MEMORY"),
+    ],
+}
+
+# Rows of each index sampled by ANALYZE so background optimization stays
+# short on large databases.
+ANALYSIS_LIMIT = 400
+
+# First SQLite version where PRAGMA optimize can check tables the
+# connection hasn't queried.
+OPTIMIZE_ALL_TABLES_VERSION = (3, 46, 0)
+
+# Devices with a per app memory class of at least this many MiB use the high
+# profile.
+HIGH_MEMORY_CLASS = 256
+
+
+def get_sqlite_profile_name(memory_class=None, low_ram_device=False, override=""):
+    """Choose the SQLite profile from the device memory
+
+    A non-empty override is used as is.
+    """
+    if override:
+        return override
+    if low_ram_device:
+        return "low"
+    if memory_class is not None and memory_class >= HIGH_MEMORY_CLASS:
+        return "high"
+    return "medium"
+
+
+def apply_sqlite_profile(cursor, profile_name):
+    for pragma, value in SQLITE_PROFILES[profile_name]:
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Apply the SQLite profile to a new Django database connection
+
+    This is a receiver for the connection_created signal.
+    """
+    if connection.vendor != "sqlite":
+        return
+
+    profile_name = os.environ.get(SQLITE_PROFILE_ENV)
+    if not profile_name:
+        return
+    if profile_name not in SQLITE_PROFILES:
+        logger.warning(f"Unknown SQLite profile {profile_name}")
+        return
+
+    with connection.cursor() as cursor:
+        apply_sqlite_profile(cursor, profile_name)
+
+
+def get_optimize_statement(version_info=sqlite3.sqlite_version_info):
+    """The statement updating the query planner statistics
+
+    PRAGMA optimize normally only considers the tables the connection has
+    queried, which is none on a fresh connection. The 0x10000 flag makes
+    it check every table, but older SQLite versions ignore it, so the
+    statistics are gathered with a limited ANALYZE instead.
+    """
+    if version_info >= OPTIMIZE_ALL_TABLES_VERSION:
+        return "PRAGMA optimize = 0x10002"
+    return "ANALYZE"
+
+
+def optimize_databases():
+    """Update the query planner statistics of all SQLite databases
+
+    The statistics are gathered on fresh connections, which are closed
+    afterwards. ANALYZE only samples ANALYSIS_LIMIT rows of each index.
+    """
+    from django.db import connections
+
+    statement = get_optimize_statement()
+    for conn in connections.all():
+        if conn.vendor != "sqlite":
+            continue
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+                cursor.execute(statement)
+        except Exception:
+            logger.exception(f"Failed to optimize database {conn.alias}")
+        finally:
+            conn.close()
@@ -0,0 +1,22 @@
+"""Precompressed static file serving
+
+Kolibri serves static files with whitenoise, which sends a compressed
+sibling of a file when the client accepts its encoding. The build adds
+.gz and optionally .br siblings to the static assets with
+compressstatic.py, but Kolibri only looks for the .gz siblings of the
+files it finds when they're first requested.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def install_brotli_static_files():
+    """Serve the .br siblings of static files too"""
+    from kolibri.utils import kolibri_whitenoise
+
+    if "br" in kolibri_whitenoise.compressed_file_extensions:
+        return
+
+    logger.info("Monkeypatching kolibri whitenoise compressed_file_extensions")
+    kolibri_whitenoise.compressed_file_extensions += ("br",)
@@ -0,0 +1,251 @@
+"""Cached zip archive serving for the zip content server
+
+Kolibri's zip content view opens the archive and parses its central
+directory for every request. install_zip_content_cache() replaces the
+view's get_embedded_file with a version that keeps the most recently
+used archives memory mapped along with their parsed directories.
+Members are read straight from the mapping, and the FileWrapper passed
+to the WSGI application as wsgi.file_wrapper streams them in larger
+blocks than Django's FileResponse. cheroot requires bytes chunks and has
+no sendfile support, so stored members are still copied out of the
+mapping once.
+"""
+import logging
+import mimetypes
+import mmap
+import os
+import struct
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+
+from django.http import HttpResponse
+from django.http import HttpResponseNotFound
+from django.http.response import FileResponse
+
+logger = logging.getLogger(__name__)
+
+# Number of archives kept open. HTML5 apps load many assets from the same
+# archive, so only a few are needed.
+ZIP_ARCHIVE_CACHE_SIZE = 8
+
+# Size of the chunks streamed to the server.
+BLOCK_SIZE = 64 << 10
+
+# Kolibri's get_embedded_file, used for remote and unsupported archives.
+_kolibri_get_embedded_file = None
+
+
+class ZipMemberFile:
+    """Read only file object for a member of a memory mapped archive
+
+    Only stored and deflated members are supported.
+    """
+
+    def __init__(self, buffer, info):
+        self.name = info.filename
+        self.size = info.file_size
+        self.compress_type = info.compress_type
+        self._buffer = buffer
+        self._offset = 0
+        self._decompressor = None
+        self._pending = b""
+        if self.compress_type == zipfile.ZIP_DEFLATED:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def read(self, size=-1):
+        if self._decompressor is None:
+            end = len(self._buffer) if size < 0 else self._offset + size
+            data = bytes(self._buffer[self._offset : end])
+            self._offset += len(data)
+            return data
+
+        chunks = [self._pending]
+        length = len(self._pending)
+        while (size < 0 or length < size) and self._offset < len(self._buffer):
+            compressed = self._buffer[self._offset : self._offset + BLOCK_SIZE]
+            self._offset += len(compressed)
+            chunk = self._decompressor.decompress(compressed)
+            chunks.append(chunk)
+            length += len(chunk)
+        if self._offset >= len(self._buffer):
+            chunks.append(self._decompressor.flush())
+        data = b"".join(chunks)
+        if size < 0:
+            self._pending = b""
+            return data
+        self._pending = data[size:]
+        return data[:size]
+
+    def close(self):
+        self._buffer = b""
+        self._pending = b""
+
+
+class ZipArchive:
+    """A memory mapped zip archive and its parsed central directory"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            with zipfile.ZipFile(f) as zf:
+                self._infos = {info.filename: info for info in zf.infolist()}
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+    def getinfo(self, name):
+        return self._infos.get(name)
+
+    def open(self, info):
+        """Open a member or return None if it isn't supported"""
+        if info.flag_bits & 0x1 or info.compress_type not in (
+            zipfile.ZIP_STORED,
+            zipfile.ZIP_DEFLATED,
+        ):
+            return None
+
+        header_end = info.header_offset + zipfile.sizeFileHeader
+        header = struct.unpack(
+            zipfile.structFileHeader, self._view[info.header_offset : header_end]
+        )
+        start = (
+            header_end
+            + header[zipfile._FH_FILENAME_LENGTH]
+            + header[zipfile._FH_EXTRA_FIELD_LENGTH]
+        )
+        return ZipMemberFile(self._view[start : start + info.compress_size], info)
+
+
+class ZipArchiveCache:
+    """LRU cache of open archives
+
+    Archives are keyed by path, modification time and size so a replaced
+    file is opened again. Evicted archives aren't closed explicitly since
+    responses may still be streaming from them. The mapping is released
+    once the last reference is gone.
+    """
+
+    def __init__(self, maxsize=ZIP_ARCHIVE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._archives = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Get the archive for a path
+
+        Returns None if the archive can't be opened or memory mapped so
+        the caller can fall back to Kolibri's handling.
+        """
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            archive = self._archives.get(key)
+            if archive is not None:
+                self._archives.move_to_end(key)
+                return archive
+
+            try:
+                archive = ZipArchive(path)
+            except (OSError, ValueError, zipfile.BadZipFile):
+                return None
+            self._archives[key] = archive
+            while len(self._archives) > self.maxsize:
+                self._archives.popitem(last=False)
+            return archive
+
+    def clear(self):
+        with self._lock:
+            self._archives.clear()
+
+
+archive_cache = ZipArchiveCache()
+
+
+def clear_zip_archive_cache():
+    archive_cache.clear()
+
+
+def get_embedded_file(zipped_path, zipped_filename, embedded_filepath):
+    """Replacement for kolibri.core.content.zip_wsgi.get_embedded_file"""
+    from kolibri.core.content.zip_wsgi import parse_html
+
+    # Remote archives are RemoteFile objects rather than paths.
+    archive = None
+    if isinstance(zipped_path, str):
+        archive = archive_cache.get(zipped_path)
+    if archive is None:
+        return _kolibri_get_embedded_file(
+            zipped_path, zipped_filename, embedded_filepath
+        )
+
+    # if no path, or a directory, is being referenced, look for an index.html
+    # file
+    if not embedded_filepath or embedded_filepath.endswith("/"):
+        embedded_filepath += "index.html"
+
+    info = archive.getinfo(embedded_filepath)
+    if info is None:
+        return HttpResponseNotFound(
+            '"{}" does not exist inside "{}"'.format(embedded_filepath, zipped_filename)
+        )
+
+    member = archive.open(info)
+    if member is None:
+        return _kolibri_get_embedded_file(
+            zipped_path, zipped_filename, embedded_filepath
+        )
+
+    content_type = (
+        mimetypes.guess_type(embedded_filepath)[0] or "application/octet-stream"
+    )
+    if embedded_filepath.endswith("htm") or embedded_filepath.endswith("html"):
+        html = parse_html(member.read())
+        response = HttpResponse(html, content_type=content_type)
+        file_size = len(response.content)
+    else:
+        response = FileResponse(member, content_type=content_type)
+        file_size = info.file_size
+
+    if file_size:
+        response["Content-Length"] = file_size
+    return response
+
+
+class FileWrapper:
+    """wsgi.file_wrapper reading files in BLOCK_SIZE chunks"""
+
+    def __init__(self, filelike, block_size=BLOCK_SIZE):
+        self.filelike = filelike
+        self.block_size = block_size
+
+    def __iter__(self):
+        return iter(lambda: self.filelike.read(self.block_size), b"")
+
+    def close(self):
+        close = getattr(self.filelike, "close", None)
+        if close is not None:
+            close()
+
+
+def with_file_wrapper(application):
+    """Wrap a WSGI application to provide FileWrapper as wsgi.file_wrapper"""
+
+    def wrapped_application(environ, start_response):
+        environ["wsgi.file_wrapper"] = FileWrapper
+        return application(environ, start_response)
+
+    return wrapped_application
+
+
+def install_zip_content_cache():
+    """Serve zip content from the archive cache"""
+    global _kolibri_get_embedded_file
+
+    from kolibri.core.content import zip_wsgi
+
+    if zip_wsgi.get_embedded_file is get_embedded_file:
+        return
+
+    logger.info("Monkeypatching kolibri zip content get_embedded_file")
+    _kolibri_get_embedded_file = zip_wsgi.get_embedded_file
+    zip_wsgi.get_embedded_file = get_embedded_file
@@ -1,10 +1,34 @@
+import hashlib
+import json
 import logging
 import os
-from importlib.util import find_spec
+import threading
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as package_version
 from logging.config import dictConfig
 from pathlib import Path
 
 from .android_utils import get_logging_config
+from .android_utils import QUEUED_LOGGING_ENV
+from .bytecode_cache import enable_bytecode_cache
+from .collections_index import COLLECTIONS_INDEX_FILENAME
+from .collections_index import install_collections_index
+from .kolibri_extra.sqlite import get_sqlite_profile_name
+from .kolibri_extra.sqlite import SQLITE_PROFILE_ENV
+from .logging_utils import STRUCTURED_LOGGING_ENV
+from .plugin_config import DISABLED_PLUGINS
+from .plugin_config import OPTIONAL_PLUGINS
+from .plugin_config import PLUGIN_DISTRIBUTIONS
+from .plugin_config import REQUIRED_PLUGINS
+from .plugin_config import update_plugins
+from .profiling import start_import_trace
+from .profiling import startup_profiling_enabled
+from .profiling import StartupProfiler
+from .progress import get_initialization_progress
+from .template_db import copy_template_databases
+from .template_db import get_template_dir
+from .thread_pool import get_thread_pool_sizes
+from .thread_pool import THREAD_POOL_MAX_ENV
 
 logger = logging.getLogger(__name__)
 
@@ -12,72 +36,174 @@ PACKAGE_PATH = Path(__file__).absolute().parent
 
 kolibri_initialized = False
 
-# These Kolibri plugins conflict with the plugins listed in REQUIRED_PLUGINS
-# or OPTIONAL_PLUGINS:
-DISABLED_PLUGINS = [
-    "kolibri.plugins.learn",
-]
+# Held while Kolibri is initialized so concurrent callers run it only once.
+_initialize_lock = threading.Lock()
 
-# These Kolibri plugins must be enabled for the application to function
-# correctly:
-REQUIRED_PLUGINS = [
-    "kolibri.plugins.app",
-    "kolibri_android.plugin",
-]
+# File in KOLIBRI_HOME recording the fingerprint of the last successfully
+# reconciled plugin configuration.
+PLUGIN_STATE_FILENAME = "android-plugin-state.json"
 
-# These Kolibri plugins will be dynamically enabled if they are available:
-OPTIONAL_PLUGINS = [
-    "kolibri_explore_plugin",
-    "kolibri_zim_plugin",
-]
 
+def initialize(*args, **kwargs):
+    """Initialize Kolibri once per process
 
-def initialize(
+    Callers wait while another thread is initializing Kolibri and return
+    once it has finished. If it failed, the error is recorded in the
+    initialization progress and the next caller tries again.
+    """
+    with _initialize_lock:
+        if kolibri_initialized:
+            logger.info("Skipping Kolibri setup")
+            return
+        try:
+            _initialize(*args, **kwargs)
+        except Exception as err:
+            get_initialization_progress().fail(err)
+            raise
+
+
+def _initialize(
     kolibri_home: str,
     kolibri_run_mode: str,
     version_name: str,
     timezone: str,
     node_id: str,
     debug: bool = False,
+    profile_startup: bool = False,
+    version_code: int = 0,
+    queued_logging: bool = False,
+    cpu_count: int = None,
+    memory_class: int = None,
+    low_ram_device: bool = False,
+    cherrypy_thread_pool: int = 0,
+    session_engine: str = "",
+    sqlite_profile: str = "",
+    request_metrics: bool = False,
+    structured_logging: bool = False,
     **kwargs,
 ):
     global kolibri_initialized
-    if kolibri_initialized:
-        logger.info("Skipping Kolibri setup")
-        return
+
+    progress = get_initialization_progress()
+    progress.reset()
+
+    profiler = StartupProfiler(enabled=startup_profiling_enabled(profile_startup))
+    if profiler.enabled:
+        # The trace is finished once the server bus has started.
+        start_import_trace()
 
     log_root = os.path.join(kolibri_home, "logs")
-    os.makedirs(log_root, exist_ok=True)
-    logging_config = get_logging_config(log_root, debug=debug)
-    dictConfig(logging_config)
+    with profiler.phase("logging"):
+        _setup_logging(log_root, debug, queued_logging, structured_logging)
+    progress.complete("logging")
 
     logger.info("Initializing Kolibri and running any upgrade routines")
 
     # if there's no database in the home folder this is the first launch
     db_path = os.path.join(kolibri_home, "db.sqlite3")
-    if not os.path.exists(db_path):
+    first_launch = not os.path.exists(db_path)
+    template_copied = False
+    if first_launch:
         logger.info("First time initialization")
+        with profiler.phase("template_database"):
+            template_copied = _copy_template_databases(
+                kolibri_home, version_name, version_code
+            )
+
+    with profiler.phase("bytecode_cache"):
+        # Compile the extracted migrations packages once per install
+        # rather than on every launch.
+        enable_bytecode_cache(kolibri_home, version_name, version_code)
+
+    with profiler.phase("environment"):
+        thread_pool_sizes = get_thread_pool_sizes(
+            cpu_count, memory_class, low_ram_device, override=cherrypy_thread_pool
+        )
+        sqlite_profile = get_sqlite_profile_name(
+            memory_class, low_ram_device, override=sqlite_profile
+        )
+        _init_kolibri_env(
+            kolibri_home,
+            kolibri_run_mode,
+            version_name,
+            version_code,
+            timezone,
+            node_id,
+            thread_pool_sizes,
+            session_engine,
+            sqlite_profile,
+            request_metrics,
+        )
+
+    with profiler.phase("monkeypatch_logging"):
+        _monkeypatch_kolibri_logging()
+    progress.complete("environment")
+
+    with profiler.phase("plugins"):
+        plugin_state_path = os.path.join(kolibri_home, PLUGIN_STATE_FILENAME)
+        plugin_fingerprint = _get_plugin_fingerprint(version_name)
+        plugins_converged = (
+            _read_state_fingerprint(plugin_state_path) == plugin_fingerprint
+        )
+        if plugins_converged:
+            logger.info("Kolibri plugins unchanged, skipping plugin setup")
+        else:
+            update_plugins()
+    progress.complete("plugins")
+
+    with profiler.phase("kolibri_initialize"):
+        _kolibri_initialize(debug=debug, **kwargs)
+
+    with profiler.phase("collections_index"):
+        _install_collections_index()
 
-    _init_kolibri_env(kolibri_home, kolibri_run_mode, version_name, timezone, node_id)
-
-    _monkeypatch_kolibri_logging()
-
-    for plugin_name in DISABLED_PLUGINS:
-        _kolibri_disable_plugin(plugin_name)
-
-    for plugin_name in REQUIRED_PLUGINS:
-        _kolibri_enable_plugin(plugin_name)
-
-    for plugin_name in OPTIONAL_PLUGINS:
-        _kolibri_enable_plugin(plugin_name, optional=True)
+    kolibri_initialized = True
+    progress.complete("migrations")
+
+    # Only record the plugin state once Kolibri has initialized successfully
+    # so that a failed startup reconciles the plugins again.
+    if not plugins_converged:
+        _write_state_fingerprint(plugin_state_path, plugin_fingerprint)
+
+    try:
+        profiler.write_report(
+            log_root,
+            version_name=version_name,
+            version_code=version_code,
+            first_launch=first_launch,
+            template_copied=template_copied,
+        )
+    except OSError:
+        logger.exception("Failed to write startup profile")
+
+
+def _setup_logging(
+    log_root: str, debug: bool, queued_logging: bool, structured_logging: bool
+):
+    os.makedirs(log_root, exist_ok=True)
 
-    _kolibri_initialize(debug=debug, **kwargs)
+    # These are set in the environment since Kolibri reconfigures logging
+    # with get_logging_config later.
+    if queued_logging:
+        os.environ[QUEUED_LOGGING_ENV] = "1"
+    if structured_logging:
+        os.environ[STRUCTURED_LOGGING_ENV] = "1"
 
-    kolibri_initialized = True
+    logging_config = get_logging_config(log_root, debug=debug)
+    dictConfig(logging_config)
 
 
 def _init_kolibri_env(
-    kolibri_home: str, run_mode: str, version_name: str, timezone: str, node_id: str
+    kolibri_home: str,
+    run_mode: str,
+    version_name: str,
+    version_code: int,
+    timezone: str,
+    node_id: str,
+    thread_pool_sizes: tuple,
+    session_engine: str,
+    sqlite_profile: str,
+    request_metrics: bool,
 ):
     os.environ["KOLIBRI_HOME"] = kolibri_home
     os.environ["KOLIBRI_RUN_MODE"] = run_mode
@@ -88,6 +214,20 @@ def _init_kolibri_env(
 
     os.environ["DJANGO_SETTINGS_MODULE"] = "kolibri_android.kolibri_extra.settings"
 
+    # Optional session storage mode read by the settings module.
+    if session_engine:
+        os.environ["KOLIBRI_ANDROID_SESSION_ENGINE"] = session_engine
+
+    # Optional per-request metrics middleware installed by the settings
+    # module.
+    if request_metrics:
+        os.environ["KOLIBRI_ANDROID_REQUEST_METRICS"] = "1"
+
+    # SQLite tuning profile applied by the Android plugin to each database
+    # connection.
+    logger.info(f"Using SQLite profile {sqlite_profile}")
+    os.environ[SQLITE_PROFILE_ENV] = sqlite_profile
+
     # Unfortunately, some packages use the presence of p4a's ANDROID_ARGUMENT
     # environment variable to detect if they're on Android.
     os.environ["ANDROID_ARGUMENT"] = ""
@@ -96,19 +236,59 @@ def _init_kolibri_env(
     if AUTOPROVISION_PATH.is_file():
         os.environ["KOLIBRI_AUTOMATIC_PROVISION_FILE"] = AUTOPROVISION_PATH.as_posix()
 
-    os.environ["KOLIBRI_CHERRYPY_THREAD_POOL"] = "2"
+    # The server starts with the initial number of threads and
+    # ServerProcessBus grows the pool up to the maximum when requests queue.
+    thread_pool_initial, thread_pool_max = thread_pool_sizes
+    logger.info(
+        f"Using CherryPy thread pool of {thread_pool_initial} to "
+        f"{thread_pool_max} threads"
+    )
+    os.environ["KOLIBRI_CHERRYPY_THREAD_POOL"] = str(thread_pool_initial)
+    os.environ[THREAD_POOL_MAX_ENV] = str(thread_pool_max)
 
     os.environ["KOLIBRI_APPS_BUNDLE_PATH"] = PACKAGE_PATH.joinpath("apps").as_posix()
     os.environ["KOLIBRI_CONTENT_COLLECTIONS_PATH"] = PACKAGE_PATH.joinpath(
         "collections"
     ).as_posix()
 
+    # The bundled apps are extracted from the APK, so the APK version
+    # identifies their contents for HTTP caching.
+    os.environ["KOLIBRI_ANDROID_BUNDLE_VERSION"] = f"{version_name}+{version_code}"
+
     # Don't set this if the retrieved id is falsy, too short, or a specific
     # id that is known to be hardcoded in many devices.
     if node_id and len(node_id) >= 16 and node_id != "9774d56d682e549c":
         os.environ["MORANGO_NODE_ID"] = node_id
 
 
+def _copy_template_databases(kolibri_home: str, version_name: str, version_code: int):
+    """Start from the pre-migrated databases built with the app"""
+    template_dir = get_template_dir()
+    if template_dir is None:
+        logger.info("No template databases, migrating from scratch")
+        return False
+
+    try:
+        return copy_template_databases(
+            template_dir, kolibri_home, version_name, version_code
+        )
+    except (OSError, ValueError, KeyError):
+        logger.exception("Failed to copy template databases")
+        return False
+
+
+def _install_collections_index():
+    """Read the collection manifests from the index built with the app"""
+    index_path = PACKAGE_PATH.joinpath(COLLECTIONS_INDEX_FILENAME)
+    if not index_path.is_file():
+        logger.info("No collections index, reading collection manifests")
+        return
+
+    install_collections_index(
+        os.environ["KOLIBRI_CONTENT_COLLECTIONS_PATH"], index_path.as_posix()
+    )
+
+
 def _monkeypatch_kolibri_logging():
     """Monkeypatch kolibri.utils.logger.get_default_logging_config
 
@@ -122,32 +302,52 @@ def _monkeypatch_kolibri_logging():
     kolibri.utils.logger.get_default_logging_config = get_logging_config
 
 
-def _kolibri_initialize(**kwargs):
-    from kolibri.utils.main import initialize
-
-    initialize(**kwargs)
-
-
-def _kolibri_disable_plugin(plugin_name: str) -> bool:
-    from kolibri.main import disable_plugin
-    from kolibri.plugins import config as plugins_config
-
-    if plugin_name in plugins_config.ACTIVE_PLUGINS:
-        logger.info(f"Disabling plugin {plugin_name}")
-        disable_plugin(plugin_name)
-
-    return True
+def _get_plugin_fingerprint(version_name: str) -> str:
+    """Fingerprint the inputs of the plugin configuration
 
+    The fingerprint covers the plugin lists, the installed versions of
+    the packages providing plugins and the APK version. If none of those
+    change, the plugin configuration from the previous launch is still
+    valid.
+    """
+    versions = {}
+    for dist in PLUGIN_DISTRIBUTIONS:
+        try:
+            versions[dist] = package_version(dist)
+        except PackageNotFoundError:
+            versions[dist] = None
+
+    data = {
+        "disabled": DISABLED_PLUGINS,
+        "required": REQUIRED_PLUGINS,
+        "optional": OPTIONAL_PLUGINS,
+        "versions": versions,
+        "version_name": version_name,
+    }
+    encoded = json.dumps(data, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _read_state_fingerprint(path: str):
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("fingerprint")
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError):
+        logger.warning(f"Ignoring invalid state file {path}", exc_info=True)
+        return None
+
+
+def _write_state_fingerprint(path: str, fingerprint: str):
+    try:
+        with open(path, "w") as f:
+            json.dump({"fingerprint": fingerprint}, f)
+    except OSError:
+        logger.exception(f"Failed to write state file {path}")
 
-def _kolibri_enable_plugin(plugin_name: str, optional=False) -> bool:
-    from kolibri.main import enable_plugin
-    from kolibri.plugins import config as plugins_config
-
-    if optional and not find_spec(plugin_name):
-        return False
 
-    if plugin_name not in plugins_config.ACTIVE_PLUGINS:
-        logger.info(f"Enabling plugin {plugin_name}")
-        enable_plugin(plugin_name)
+def _kolibri_initialize(**kwargs):
+    from kolibri.utils.main import initialize
 
-    return True
+    initialize(**kwargs)
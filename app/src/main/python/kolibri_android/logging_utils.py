@@ -0,0 +1,132 @@
+"""Log formatters and filters
+
+This module doesn't depend on Android or Kolibri so it can be used by
+host benchmarks.
+"""
+import json
+import logging
+import threading
+import time
+
+# Setting this environment variable to 1 makes the logging configuration
+# write JSON lines to the log file.
+STRUCTURED_LOGGING_ENV = "KOLIBRI_ANDROID_STRUCTURED_LOGGING"
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter caching the formatted timestamp for each second
+
+    The timestamp format only has second resolution, so most records
+    logged in a burst can reuse the previous record's timestamp instead
+    of calling strftime again.
+    """
+
+    def __init__(self, fmt=None, datefmt="%Y-%m-%d %H:%M:%S", **kwargs):
+        super().__init__(fmt, datefmt, **kwargs)
+
+        self._cached_time = (None, None)
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, cached_time = self._cached_time
+        if second == cached_second:
+            return cached_time
+
+        formatted = time.strftime(datefmt or self.datefmt, self.converter(second))
+        self._cached_time = (second, formatted)
+        return formatted
+
+
+class FullFormatter(CachedTimeFormatter):
+    """Formatter for the log file
+
+    Output is the same as the "%(asctime)s %(levelname)-8s %(name)s:
+    %(message)s" format, but the line is built directly rather than by
+    interpolating the record's attribute dict.
+    """
+
+    def usesTime(self):
+        return True
+
+    def formatMessage(self, record):
+        return f"{record.asctime} {record.levelname:<8} {record.name}: {record.message}"
+
+
+class SimpleFormatter(logging.Formatter):
+    """Formatter for the Android log
+
+    Output is the same as the "%(name)s: %(message)s" format.
+    """
+
+    def usesTime(self):
+        return False
+
+    def formatMessage(self, record):
+        return f"{record.name}: {record.message}"
+
+
+class JSONFormatter(CachedTimeFormatter):
+    """Formatter writing each record as a line of JSON
+
+    Each object has the time, level, logger name, thread name and
+    message, plus the formatted exception and stack if present.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "created": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+class RateLimitFilter(logging.Filter):
+    """Filter limiting the rate of records from a noisy logger
+
+    Records are allowed at an average of rate per second with bursts of
+    up to burst records. The number of records dropped is added to the
+    next record that's allowed. Attach a separate instance to each
+    logger so they're limited independently.
+    """
+
+    def __init__(self, name="", rate=10, burst=50):
+        super().__init__(name)
+
+        self.rate = rate
+        self.burst = burst
+        self.suppressed = 0
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not super().filter(record):
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            if self._tokens < 1:
+                self.suppressed += 1
+                return False
+            self._tokens -= 1
+            suppressed = self.suppressed
+            self.suppressed = 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} records suppressed)"
+            record.args = None
+        return True
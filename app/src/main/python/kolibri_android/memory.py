@@ -0,0 +1,184 @@
+"""Memory pressure handling
+
+Android reports memory pressure to components with onTrimMemory levels.
+MemoryPressureHandler runs the steps registered for a level and logs the
+process RSS before and after each step. This module doesn't depend on Android so the levels can
+be exercised on a Linux host.
+"""
+import gc
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Trim levels from android.content.ComponentCallbacks2.
+TRIM_MEMORY_RUNNING_MODERATE = 5
+TRIM_MEMORY_RUNNING_LOW = 10
+TRIM_MEMORY_RUNNING_CRITICAL = 15
+TRIM_MEMORY_UI_HIDDEN = 20
+TRIM_MEMORY_BACKGROUND = 40
+TRIM_MEMORY_MODERATE = 60
+TRIM_MEMORY_COMPLETE = 80
+
+# Levels at which each kind of memory is shed. The levels aren't ordered
+# by severity: UI_HIDDEN is sent every time the user leaves the app and
+# BACKGROUND while it's cached, so they only clear caches. Downloads and
+# imports run in the background, so components are only paused when the
+# running app is critically low on memory.
+CACHE_TRIM_LEVELS = frozenset(
+    [
+        TRIM_MEMORY_RUNNING_LOW,
+        TRIM_MEMORY_RUNNING_CRITICAL,
+        TRIM_MEMORY_UI_HIDDEN,
+        TRIM_MEMORY_BACKGROUND,
+        TRIM_MEMORY_MODERATE,
+        TRIM_MEMORY_COMPLETE,
+    ]
+)
+THREAD_POOL_TRIM_LEVELS = frozenset(
+    [
+        TRIM_MEMORY_RUNNING_LOW,
+        TRIM_MEMORY_RUNNING_CRITICAL,
+        TRIM_MEMORY_MODERATE,
+        TRIM_MEMORY_COMPLETE,
+    ]
+)
+PAUSE_TRIM_LEVELS = frozenset([TRIM_MEMORY_RUNNING_CRITICAL])
+
+# Seconds after the last trim before paused components are resumed. Android
+# doesn't report when memory pressure ends.
+RESUME_DELAY = 5 * 60
+
+
+def get_rss():
+    """The resident set size of the process in bytes or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def clear_caches():
+    """Clear the in-memory Django caches and Python's regex cache
+
+    Caches with other backends don't use process memory and are left
+    alone, as is the session cache since it may hold the only copy of
+    session changes.
+    """
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    session_alias = getattr(settings, "SESSION_CACHE_ALIAS", None)
+    for alias in settings.CACHES:
+        if alias == session_alias:
+            continue
+        cache = caches[alias]
+        if isinstance(cache, LocMemCache):
+            logger.debug(f"Clearing {alias} cache")
+            cache.clear()
+
+    re.purge()
+
+
+def shrink_thread_pool(pool):
+    """Remove threads above the minimum from a cheroot thread pool"""
+    excess = len(pool._threads) - pool.min
+    if excess > 0:
+        pool.shrink(excess)
+
+
+class MemoryPressureHandler:
+    """Shed memory in steps for each trim level
+
+    Each step runs for the trim levels it was added with, in the order
+    the steps were added. A step can have a resume function to undo it, such as restarting a
+    paused component. Resume functions are called once no trim has
+    happened for RESUME_DELAY seconds or when resume() is called.
+    Garbage is collected after the steps for every level.
+    """
+
+    def __init__(self, resume_delay=RESUME_DELAY):
+        self.resume_delay = resume_delay
+        self._steps = []
+        self._paused = {}
+        self._resume_timer = None
+        self._lock = threading.RLock()
+
+    def add_step(self, levels, name, func, resume=None):
+        self._steps.append((frozenset(levels), name, func, resume))
+
+    def trim(self, level):
+        """Run the steps for a trim level
+
+        Returns a list of (step, RSS before, RSS after) tuples.
+        """
+        report = []
+        with self._lock:
+            for step_levels, name, func, resume in self._steps:
+                if level not in step_levels or name in self._paused:
+                    continue
+                report.append(self._run_step(name, func))
+                if resume is not None:
+                    self._paused[name] = resume
+            report.append(self._run_step("gc", gc.collect))
+            self._schedule_resume()
+
+        start_rss = report[0][1]
+        end_rss = report[-1][2]
+        if start_rss is not None and end_rss is not None:
+            logger.info(
+                f"Trimmed memory for level {level}: "
+                f"RSS {start_rss >> 20} MiB to {end_rss >> 20} MiB"
+            )
+        return report
+
+    def resume(self):
+        """Resume paused components"""
+        with self._lock:
+            self._cancel_resume()
+            paused = self._paused
+            self._paused = {}
+            for name, resume in paused.items():
+                logger.info(f"Resuming {name} after memory pressure")
+                try:
+                    resume()
+                except Exception:
+                    logger.exception(f"Failed to resume {name}")
+
+    def reset(self):
+        """Forget paused components without resuming them"""
+        with self._lock:
+            self._cancel_resume()
+            self._paused = {}
+
+    def _run_step(self, name, func):
+        before = get_rss()
+        try:
+            func()
+        except Exception:
+            logger.exception(f"Memory trim step {name} failed")
+        after = get_rss()
+        if before is not None and after is not None:
+            logger.debug(
+                f"Memory trim step {name}: RSS {before >> 20} MiB to {after >> 20} MiB"
+            )
+        return name, before, after
+
+    def _schedule_resume(self):
+        self._cancel_resume()
+        if not self._paused:
+            return
+        self._resume_timer = threading.Timer(self.resume_delay, self.resume)
+        self._resume_timer.name = "MemoryPressureResume"
+        self._resume_timer.daemon = True
+        self._resume_timer.start()
+
+    def _cancel_resume(self):
+        if self._resume_timer is not None:
+            self._resume_timer.cancel()
+            self._resume_timer = None
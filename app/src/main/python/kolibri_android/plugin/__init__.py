@@ -0,0 +1 @@
+default_app_config = "kolibri_android.plugin.apps.AndroidPluginConfig"
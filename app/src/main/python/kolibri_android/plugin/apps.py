@@ -0,0 +1,20 @@
+# Copyright 2023 Endless OS Foundation LLC
+# SPDX-License-Identifier: GPL-2.0-or-later
+from django.apps import AppConfig
+
+
+class AndroidPluginConfig(AppConfig):
+    # The label is left as the default "plugin" to match the applied
+    # migrations.
+    name = "kolibri_android.plugin"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from ..kolibri_extra.sqlite import configure_connection
+
+        # This app is ready after Kolibri's core apps, so the SQLite profile
+        # is applied after Kolibri's own connection pragmas.
+        connection_created.connect(
+            configure_connection, dispatch_uid="kolibri_android_sqlite_profile"
+        )
@@ -0,0 +1,72 @@
+"""Kolibri plugins enabled for the application
+
+This module doesn't depend on Android, so the build can configure the
+same plugins when it creates the template databases.
+"""
+import logging
+from importlib.util import find_spec
+
+logger = logging.getLogger(__name__)
+
+# These Kolibri plugins conflict with the plugins listed in REQUIRED_PLUGINS
+# or OPTIONAL_PLUGINS:
+DISABLED_PLUGINS = [
+    "kolibri.plugins.learn",
+]
+
+# These Kolibri plugins must be enabled for the application to function
+# correctly:
+REQUIRED_PLUGINS = [
+    "kolibri.plugins.app",
+    "kolibri_android.plugin",
+]
+
+# These Kolibri plugins will be dynamically enabled if they are available:
+OPTIONAL_PLUGINS = [
+    "kolibri_explore_plugin",
+    "kolibri_zim_plugin",
+]
+
+# Distributions whose versions determine if the plugin configuration needs to
+# be reconciled again.
+PLUGIN_DISTRIBUTIONS = [
+    "kolibri",
+    "kolibri-explore-plugin",
+    "kolibri-zim-plugin",
+]
+
+
+def update_plugins():
+    for plugin_name in DISABLED_PLUGINS:
+        _disable_plugin(plugin_name)
+
+    for plugin_name in REQUIRED_PLUGINS:
+        _enable_plugin(plugin_name)
+
+    for plugin_name in OPTIONAL_PLUGINS:
+        _enable_plugin(plugin_name, optional=True)
+
+
+def _disable_plugin(plugin_name: str) -> bool:
+    from kolibri.main import disable_plugin
+    from kolibri.plugins import config as plugins_config
+
+    if plugin_name in plugins_config.ACTIVE_PLUGINS:
+        logger.info(f"Disabling plugin {plugin_name}")
+        disable_plugin(plugin_name)
+
+    return True
+
+
+def _enable_plugin(plugin_name: str, optional=False) -> bool:
+    from kolibri.main import enable_plugin
+    from kolibri.plugins import config as plugins_config
+
+    if optional and not find_spec(plugin_name):
+        return False
+
+    if plugin_name not in plugins_config.ACTIVE_PLUGINS:
+        logger.info(f"Enabling plugin {plugin_name}")
+        enable_plugin(plugin_name)
+
+    return True
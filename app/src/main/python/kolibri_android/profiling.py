@@ -0,0 +1,199 @@
+import importlib._bootstrap
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timezone
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PROFILE_FILENAME = "startup-profile.json"
+IMPORT_TIME_FILENAME = "import-time.txt"
+STARTUP_PROFILE_ENV = "KOLIBRI_ANDROID_PROFILE_STARTUP"
+
+# Version of the report format. Bump this when the structure changes so the host
+# side comparison script can refuse to compare incompatible reports.
+STARTUP_PROFILE_VERSION = 1
+
+
+def startup_profiling_enabled(default=False):
+    """Whether startup profiling should be enabled
+
+    The KOLIBRI_ANDROID_PROFILE_STARTUP environment variable overrides
+    the default when set.
+    """
+    value = os.environ.get(STARTUP_PROFILE_ENV)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+class StartupProfiler:
+    """Record timing information for startup phases
+
+    Each phase records the elapsed wall clock time, the process CPU time
+    and the number of modules imported while it ran. When disabled, the
+    phase context manager does nothing so it can be left in place on
+    the normal startup path.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._modules_start = len(sys.modules)
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        modules_start = len(sys.modules)
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            imports = len(sys.modules) - modules_start
+            self.phases.append(
+                {
+                    "name": name,
+                    "start": wall_start - self._wall_start,
+                    "wall": wall,
+                    "cpu": cpu,
+                    "imports": imports,
+                }
+            )
+            logger.debug(
+                f"Startup phase {name}: wall {wall:.3f}s, cpu {cpu:.3f}s, "
+                f"{imports} imports"
+            )
+
+    def get_report(self, **metadata):
+        return {
+            "version": STARTUP_PROFILE_VERSION,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "metadata": metadata,
+            "total": {
+                "wall": time.perf_counter() - self._wall_start,
+                "cpu": time.process_time() - self._cpu_start,
+                "imports": len(sys.modules) - self._modules_start,
+            },
+            "phases": self.phases,
+        }
+
+    def write_report(self, log_root, **metadata):
+        """Write the JSON timeline to the log directory
+
+        Returns the path to the report or None if profiling is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        path = os.path.join(log_root, STARTUP_PROFILE_FILENAME)
+        report = self.get_report(**metadata)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(
+            f"Wrote startup profile to {path} (total {report['total']['wall']:.3f}s)"
+        )
+        return path
+
+
+class ImportTracer:
+    """Record module import times like python -X importtime
+
+    The -X importtime option can't be enabled from within an embedded
+    interpreter, so this wraps importlib's _find_and_load, which is what
+    the interpreter calls whenever a module isn't already in
+    sys.modules. The report uses the same format as -X importtime so it
+    can be consumed by existing tools such as tuna.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._orig_find_and_load = importlib._bootstrap._find_and_load
+        self.installed = False
+
+    def install(self):
+        if self.installed:
+            return
+        importlib._bootstrap._find_and_load = self._find_and_load
+        self.installed = True
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        importlib._bootstrap._find_and_load = self._orig_find_and_load
+        self.installed = False
+
+    def _find_and_load(self, name, import_):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        # Each stack entry accumulates the cumulative time of its children.
+        stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return self._orig_find_and_load(name, import_)
+        finally:
+            cumulative = (time.perf_counter_ns() - start) // 1000
+            children = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            with self._lock:
+                self.records.append(
+                    (len(stack), name, cumulative - children, cumulative)
+                )
+
+    def write_report(self, path):
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w") as f:
+            f.write("import time: self [us] | cumulative | imported package\n")
+            for depth, name, self_us, cumulative_us in records:
+                f.write(
+                    f"import time: {self_us:>9} | {cumulative_us:>10} | "
+                    f"{'  ' * depth}{name}\n"
+                )
+        logger.info(f"Wrote import times for {len(records)} modules to {path}")
+
+
+_import_tracer = None
+
+
+def start_import_trace():
+    """Start tracing module imports for the process"""
+    global _import_tracer
+    if _import_tracer is None:
+        _import_tracer = ImportTracer()
+    _import_tracer.install()
+
+
+def finish_import_trace(log_root):
+    """Stop tracing module imports and write the report
+
+    Does nothing if import tracing wasn't started. Returns the path to
+    the report or None.
+    """
+    global _import_tracer
+    if _import_tracer is None:
+        return None
+
+    tracer = _import_tracer
+    _import_tracer = None
+    tracer.uninstall()
+    path = os.path.join(log_root, IMPORT_TIME_FILENAME)
+    tracer.write_report(path)
+    return path
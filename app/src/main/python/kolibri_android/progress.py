@@ -0,0 +1,86 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Startup stages in the order they complete.
+STAGES = [
+    "logging",
+    "environment",
+    "plugins",
+    "migrations",
+    "server",
+]
+
+
+class InitializationProgress:
+    """Thread safe record of completed startup stages
+
+    The initialization code marks each stage in STAGES as it completes
+    while other threads poll the progress or wait for a stage. If
+    startup fails, the error is recorded and all waiters are released.
+    Each initialization attempt starts by resetting the progress so that
+    a retry doesn't report the stages or error of a failed attempt.
+    """
+
+    def __init__(self):
+        self.completed = []
+        self.error = None
+        self._condition = threading.Condition()
+
+    def reset(self):
+        with self._condition:
+            self.completed = []
+            self.error = None
+
+    def complete(self, stage):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown startup stage {stage}")
+        with self._condition:
+            if stage not in self.completed:
+                self.completed.append(stage)
+                logger.debug(f"Startup stage {stage} complete")
+            self._condition.notify_all()
+
+    def fail(self, error):
+        with self._condition:
+            self.error = error
+            self._condition.notify_all()
+
+    @property
+    def stage(self):
+        """The last completed stage or None"""
+        with self._condition:
+            return self.completed[-1] if self.completed else None
+
+    @property
+    def fraction(self):
+        """The fraction of stages completed between 0 and 1"""
+        with self._condition:
+            return len(self.completed) / len(STAGES)
+
+    def is_complete(self, stage=STAGES[-1]):
+        with self._condition:
+            return stage in self.completed
+
+    def wait(self, stage=STAGES[-1], timeout=None):
+        """Wait until a stage has completed
+
+        Returns True if the stage completed, False on timeout. If startup
+        failed, the error is raised.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: stage in self.completed or self.error is not None, timeout
+            )
+            if self.error is not None:
+                raise self.error
+            return stage in self.completed
+
+
+# Progress of the process wide Kolibri startup.
+_progress = InitializationProgress()
+
+
+def get_initialization_progress():
+    return _progress
@@ -1,41 +1,165 @@
 import logging
+import os
+import threading
+import time
 
-from kolibri.core.device.models import DeviceAppKey
-from kolibri.plugins.app.utils import interface
 from kolibri.utils.server import BaseKolibriProcessBus
 from kolibri.utils.server import KolibriServerPlugin
+from kolibri.utils.server import ProcessControlPlugin
 from kolibri.utils.server import ServicesPlugin
 from kolibri.utils.server import ZeroConfPlugin
 from kolibri.utils.server import ZipContentServerPlugin
 
+from .android_utils import flush_log_queue
 from .android_utils import share_file
+from .discovery import DeferredZeroConf
+from .discovery import ZEROCONF_DELAY
+from .kolibri_extra.static_files import install_brotli_static_files
+from .memory import CACHE_TRIM_LEVELS
+from .memory import clear_caches
+from .memory import MemoryPressureHandler
+from .memory import PAUSE_TRIM_LEVELS
+from .memory import shrink_thread_pool
+from .memory import THREAD_POOL_TRIM_LEVELS
+from .profiling import finish_import_trace
+from .progress import get_initialization_progress
+from .thread_pool import THREAD_POOL_MAX_ENV
+from .thread_pool import ThreadPoolMonitor
 
 logger = logging.getLogger(__name__)
 
+# Seconds after the server starts before the SQLite query planner
+# statistics are first updated, and between later updates.
+SQLITE_OPTIMIZE_DELAY = 60
+SQLITE_OPTIMIZE_INTERVAL = 6 * 60 * 60
+
+
+def _unsubscribe_process_control(bus):
+    # The process control plugin polls a file every second so the kolibri
+    # command can stop or restart the server, which isn't possible on
+    # Android. Stopping the bus also waits up to a second for its thread.
+    for listener in list(bus.listeners["START"]):
+        plugin = getattr(listener, "__self__", None)
+        if isinstance(plugin, ProcessControlPlugin):
+            plugin.unsubscribe()
+
+
+class ZipCacheServerPlugin(ZipContentServerPlugin):
+    """Zip content server reading archives from a cache of open archives"""
+
+    @property
+    def application(self):
+        from .kolibri_extra.zip_content import install_zip_content_cache
+        from .kolibri_extra.zip_content import with_file_wrapper
+
+        install_zip_content_cache()
+        return with_file_wrapper(super().application)
+
 
 class ServerProcessBus(BaseKolibriProcessBus):
-    def __init__(self, *args, enable_zeroconf=True, **kwargs):
+    def __init__(self, *args, enable_zeroconf=True, zeroconf_delay=None, **kwargs):
+        # Kolibri modules that pull in the Django model layer are imported
+        # where they're used so importing this module stays cheap.
+        from kolibri.plugins.app.utils import interface
+
         super().__init__(*args, **kwargs)
+        _unsubscribe_process_control(self)
+        install_brotli_static_files()
 
         # Wire up the share_file interface.
         interface.register(share_file=share_file)
 
-        ServicesPlugin(self).subscribe()
+        self.services = ServicesPlugin(self)
+        self.services.subscribe()
 
+        # The ZeroConf broadcast is started in the background after the server
+        # is running rather than by the bus.
+        self.zeroconf = None
         if enable_zeroconf:
-            ZeroConfPlugin(self, self.port).subscribe()
+            if zeroconf_delay is None:
+                zeroconf_delay = ZEROCONF_DELAY
+            self.zeroconf = DeferredZeroConf(
+                ZeroConfPlugin(self, self.port), delay=zeroconf_delay
+            )
 
-        KolibriServerPlugin(self, self.port).subscribe()
+        self.kolibri_server = KolibriServerPlugin(self, self.port)
+        self.kolibri_server.subscribe()
+        self.thread_pool_monitor = None
+        self._optimize_stop = threading.Event()
+        self._optimize_thread = None
 
-        ZipContentServerPlugin(self, self.zip_port).subscribe()
+        ZipCacheServerPlugin(self, self.zip_port).subscribe()
+
+        self.memory_pressure = self._create_memory_pressure_handler()
 
     def start(self):
-        logger.info("Starting bus")
+        """Start serving or resume serving after suspend()"""
+        if self.state == "IDLE":
+            logger.info("Resuming bus")
+        else:
+            logger.info("Starting bus")
+        start_time = time.perf_counter()
         self.graceful()
+        if self.zeroconf is not None:
+            self.zeroconf.start()
+        logger.info(f"Bus started in {time.perf_counter() - start_time:.3f}s")
+        self._start_thread_pool_monitor()
+        self._start_sqlite_optimize()
+        get_initialization_progress().complete("server")
+
+        # If import tracing was enabled during initialization, startup is now
+        # complete.
+        log_root = os.path.join(os.environ["KOLIBRI_HOME"], "logs")
+        try:
+            finish_import_trace(log_root)
+        except OSError:
+            logger.exception("Failed to write import trace")
+
+    def suspend(self):
+        """Stop serving while keeping Kolibri loaded
+
+        The servers and task workers are stopped and their sockets
+        released, but Django and the Kolibri plugins stay loaded so that
+        start() can resume serving quickly. The SQLite query planner
+        statistics are updated while nothing is using the databases.
+        """
+        from .kolibri_extra.sqlite import optimize_databases
+
+        logger.info("Suspending bus")
+        self._stop_threads()
+        self.transition("IDLE")
+        self._flush()
+        optimize_databases()
 
     def stop(self):
         logger.info("Stopping bus")
+        self._stop_threads()
         self.transition("EXITED")
+        self._flush()
+
+    def trim_memory(self, level, wait=False):
+        """Shed memory for an Android onTrimMemory level
+
+        Since this is called from the main thread, the memory is shed in
+        a separate thread unless wait is true, in which case the list of
+        (step, RSS before, RSS after) tuples is returned.
+        """
+        if wait:
+            return self.memory_pressure.trim(level)
+
+        thread = threading.Thread(
+            target=self.memory_pressure.trim,
+            args=(level,),
+            name="MemoryTrim",
+            daemon=True,
+        )
+        thread.start()
+        return None
+
+    def start_zeroconf(self):
+        """Start the ZeroConf broadcast without waiting for the delay"""
+        if self.zeroconf is not None:
+            self.zeroconf.start_broadcast()
 
     def get_url(self):
         if self.state != "RUN":
@@ -43,4 +167,128 @@ class ServerProcessBus(BaseKolibriProcessBus):
         return f"http://127.0.0.1:{self.port}/"
 
     def get_app_key(self):
+        from kolibri.core.device.models import DeviceAppKey
+
         return DeviceAppKey.get_app_key()
+
+    def _create_memory_pressure_handler(self):
+        handler = MemoryPressureHandler()
+        handler.add_step(CACHE_TRIM_LEVELS, "caches", clear_caches)
+        handler.add_step(
+            CACHE_TRIM_LEVELS, "zip_archives", self._clear_zip_archive_cache
+        )
+        handler.add_step(
+            THREAD_POOL_TRIM_LEVELS, "thread_pool", self._shrink_thread_pool
+        )
+        if self.zeroconf is not None:
+            handler.add_step(
+                PAUSE_TRIM_LEVELS,
+                "zeroconf",
+                self.zeroconf.stop,
+                resume=self._resume_zeroconf,
+            )
+        handler.add_step(
+            PAUSE_TRIM_LEVELS,
+            "tasks",
+            self.services.STOP,
+            resume=self._resume_services,
+        )
+        return handler
+
+    def _clear_zip_archive_cache(self):
+        from .kolibri_extra.zip_content import clear_zip_archive_cache
+
+        clear_zip_archive_cache()
+
+    def _shrink_thread_pool(self):
+        pool = getattr(self.kolibri_server.httpserver, "requests", None)
+        if pool is not None:
+            shrink_thread_pool(pool)
+
+    def _resume_zeroconf(self):
+        if self.state == "RUN":
+            self.zeroconf.start()
+
+    def _resume_services(self):
+        if self.state == "RUN":
+            self.services.START()
+
+    def _stop_threads(self):
+        # The bus stops and starts paused components itself.
+        self.memory_pressure.reset()
+        if self.zeroconf is not None:
+            self.zeroconf.stop()
+        if self.thread_pool_monitor is not None:
+            self.thread_pool_monitor.stop()
+            self.thread_pool_monitor = None
+        self._stop_sqlite_optimize()
+
+    def _flush(self):
+        self._flush_sessions()
+        self._write_request_metrics()
+        flush_log_queue()
+
+    def _flush_sessions(self):
+        from django.conf import settings
+
+        # Persist any session changes still pending in the write-behind
+        # session backend.
+        if settings.SESSION_ENGINE == "kolibri_android.kolibri_extra.sessions":
+            from .kolibri_extra.sessions import flush_sessions
+
+            flush_sessions()
+
+    def _write_request_metrics(self):
+        from django.conf import settings
+
+        metrics_middleware = (
+            "kolibri_android.kolibri_extra.metrics.RequestMetricsMiddleware"
+        )
+        if metrics_middleware not in settings.MIDDLEWARE:
+            return
+
+        from .kolibri_extra.metrics import write_request_metrics
+
+        log_root = os.path.join(os.environ["KOLIBRI_HOME"], "logs")
+        try:
+            write_request_metrics(log_root)
+        except OSError:
+            logger.exception("Failed to write request metrics")
+
+    def _start_sqlite_optimize(self):
+        if self._optimize_thread is not None:
+            return
+        self._optimize_stop.clear()
+        self._optimize_thread = threading.Thread(
+            target=self._run_sqlite_optimize, name="SQLiteOptimize", daemon=True
+        )
+        self._optimize_thread.start()
+
+    def _stop_sqlite_optimize(self):
+        if self._optimize_thread is None:
+            return
+        self._optimize_stop.set()
+        self._optimize_thread.join()
+        self._optimize_thread = None
+
+    def _run_sqlite_optimize(self):
+        from .kolibri_extra.sqlite import optimize_databases
+
+        delay = SQLITE_OPTIMIZE_DELAY
+        while not self._optimize_stop.wait(delay):
+            logger.debug("Optimizing SQLite databases")
+            optimize_databases()
+            delay = SQLITE_OPTIMIZE_INTERVAL
+
+    def _start_thread_pool_monitor(self):
+        pool = getattr(self.kolibri_server.httpserver, "requests", None)
+        if pool is None:
+            logger.warning("Server thread pool not found, not resizing it")
+            return
+
+        pool_max = int(os.environ.get(THREAD_POOL_MAX_ENV, 0))
+        if pool_max <= pool.min:
+            return
+
+        self.thread_pool_monitor = ThreadPoolMonitor(pool, pool_max)
+        self.thread_pool_monitor.start()
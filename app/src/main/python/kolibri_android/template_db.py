@@ -0,0 +1,123 @@
+"""Pre-migrated template databases for the first launch
+
+Migrating empty databases is the slowest part of the first launch. The
+migration graph of every app is loaded and Kolibri migrates each
+database once for the new install and again for each plugin it sees for
+the first time. The build runs the migrations once with templatedb.py
+and ships the resulting SQLite databases and Kolibri's plugin state in
+the kolibri_android_template package along with a stamp recording the
+APK and Kolibri versions they were created for. On the first launch the
+files are copied into KOLIBRI_HOME before Kolibri initializes, so
+Kolibri sees an up to date installation and only applies migrations
+that postdate the template.
+
+The template isn't provisioned. The facility, its dataset and the
+Morango instance and database IDs have to be unique to each device, so
+automatic provisioning still runs on the first launch.
+
+This module doesn't depend on Android or Kolibri so the build can use it.
+"""
+import json
+import logging
+import os
+import shutil
+from importlib.util import find_spec
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PACKAGE = "kolibri_android_template"
+TEMPLATE_STAMP_FILENAME = "template.json"
+TEMPLATE_STAMP_VERSION = 1
+
+# Kolibri's plugin state. The file recording the Kolibri version of
+# KOLIBRI_HOME is written from the stamp rather than shipped since
+# hidden files are easily dropped from the APK.
+PLUGINS_FILENAME = "plugins.json"
+VERSION_FILENAME = ".data_version"
+
+
+def get_template_dir():
+    """Returns the template package directory or None if it isn't installed"""
+    spec = find_spec(TEMPLATE_PACKAGE)
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return list(spec.submodule_search_locations)[0]
+
+
+def read_template_stamp(template_dir):
+    path = os.path.join(template_dir, TEMPLATE_STAMP_FILENAME)
+    with open(path, "r") as f:
+        stamp = json.load(f)
+    if stamp.get("version") != TEMPLATE_STAMP_VERSION:
+        raise ValueError(f"Unsupported template stamp version in {path}")
+    return stamp
+
+
+def write_template_stamp(
+    template_dir, version_name, version_code, kolibri_version, migrations
+):
+    """Write the template stamp
+
+    migrations is a mapping of database file names to the applied
+    migrations in each as "app.name" strings.
+    """
+    stamp = {
+        "version": TEMPLATE_STAMP_VERSION,
+        "version_name": version_name,
+        "version_code": version_code,
+        "kolibri_version": kolibri_version,
+        "files": sorted(migrations) + [PLUGINS_FILENAME],
+        "migrations": {name: sorted(names) for name, names in migrations.items()},
+    }
+    path = os.path.join(template_dir, TEMPLATE_STAMP_FILENAME)
+    with open(path, "w") as f:
+        json.dump(stamp, f, indent=2, sort_keys=True)
+
+
+def copy_template_databases(template_dir, kolibri_home, version_name, version_code):
+    """Copy the template files into KOLIBRI_HOME
+
+    Nothing is copied unless the template was created for this APK
+    version and none of its files exist in KOLIBRI_HOME. Returns whether
+    the files were copied. Raises OSError or ValueError if the template
+    can't be read, in which case nothing is left behind.
+    """
+    stamp = read_template_stamp(template_dir)
+    if (stamp["version_name"], stamp["version_code"]) != (version_name, version_code):
+        logger.warning(
+            f"Ignoring template databases for {stamp['version_name']} "
+            f"({stamp['version_code']})"
+        )
+        return False
+
+    names = stamp["files"] + [VERSION_FILENAME]
+    targets = [os.path.join(kolibri_home, name) for name in names]
+    if any(os.path.exists(target) for target in targets):
+        logger.info("Kolibri files exist, not copying template databases")
+        return False
+
+    os.makedirs(kolibri_home, exist_ok=True)
+    copied = []
+    try:
+        for name, target in zip(names, targets):
+            tmp_target = f"{target}.tmp"
+            if name == VERSION_FILENAME:
+                with open(tmp_target, "w") as f:
+                    f.write(stamp["kolibri_version"])
+            else:
+                shutil.copyfile(os.path.join(template_dir, name), tmp_target)
+            os.replace(tmp_target, target)
+            copied.append(target)
+    except OSError:
+        for path in copied + [tmp_target]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        raise
+
+    logger.info(
+        f"Copied template databases for Kolibri {stamp['kolibri_version']}: "
+        f"{', '.join(stamp['files'])}"
+    )
+    return True
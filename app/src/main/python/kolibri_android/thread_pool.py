@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Environment variable holding the maximum number of threads the CherryPy pool
+# can grow to. Kolibri itself reads the initial size from
+# KOLIBRI_CHERRYPY_THREAD_POOL.
+THREAD_POOL_MAX_ENV = "KOLIBRI_ANDROID_CHERRYPY_THREAD_POOL_MAX"
+
+# Pool size bounds. Low RAM devices get the minimum to keep memory usage down.
+MIN_THREAD_POOL = 2
+MAX_THREAD_POOL = 6
+
+# Devices with a per app memory class below this (in MiB) are treated as
+# constrained even if they aren't flagged as low RAM devices.
+CONSTRAINED_MEMORY_CLASS = 192
+
+# How often the pool queue is checked and how many consecutive idle checks are
+# needed before a thread is removed.
+MONITOR_INTERVAL = 0.5
+SHRINK_IDLE_CHECKS = 20
+
+
+def get_thread_pool_sizes(
+    cpu_count=None, memory_class=None, low_ram_device=False, override=0
+):
+    """Choose the initial and maximum CherryPy thread pool sizes
+
+    The initial size scales with the number of CPUs, limited on
+    constrained devices. The pool can grow to twice its initial size
+    when requests are queued. A positive override sets a fixed size.
+    """
+    if override > 0:
+        return override, override
+
+    if cpu_count is None:
+        cpu_count = os.cpu_count() or MIN_THREAD_POOL
+
+    if low_ram_device:
+        return MIN_THREAD_POOL, MIN_THREAD_POOL
+
+    size = max(MIN_THREAD_POOL, min(cpu_count, MAX_THREAD_POOL))
+    if memory_class is not None and memory_class < CONSTRAINED_MEMORY_CLASS:
+        size = min(size, MIN_THREAD_POOL + 1)
+    return size, size * 2
+
+
+class ThreadPoolMonitor:
+    """Grow and shrink a cheroot thread pool based on its queue depth
+
+    The pool starts at its minimum size. When connections are waiting in
+    the queue, threads are added up to max_threads. After the pool has
+    had idle threads for SHRINK_IDLE_CHECKS consecutive checks, one
+    thread above the minimum is removed.
+    """
+
+    def __init__(self, pool, max_threads, interval=MONITOR_INTERVAL):
+        self.pool = pool
+        self.max_threads = max_threads
+        self.interval = interval
+        self._idle_checks = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        logger.debug(
+            f"Monitoring thread pool with {self.pool.min} to {self.max_threads} threads"
+        )
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="ThreadPoolMonitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Failed to resize thread pool")
+
+    def check(self):
+        size = len(self.pool._threads)
+        queued = self.pool.qsize
+        if queued > 0 and size < self.max_threads:
+            amount = min(queued, self.max_threads - size)
+            logger.debug(f"Growing thread pool by {amount} for {queued} queued")
+            self.pool.grow(amount)
+            self._idle_checks = 0
+        elif self.pool.idle > 0 and size > self.pool.min:
+            self._idle_checks += 1
+            if self._idle_checks >= SHRINK_IDLE_CHECKS:
+                logger.debug("Shrinking thread pool by 1")
+                self.pool.shrink(1)
+                self._idle_checks = 0
+        else:
+            self._idle_checks = 0